@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import Dataset, DatasetCategory, DatasetVersion, DatasetDownload, Comment, Publisher
+from .models import Dataset, DatasetCategory, DatasetVersion, DatasetDownload, Comment, Publisher, format_file_size
 
 
 @admin.register(Publisher)
@@ -73,7 +73,7 @@ class DatasetAdmin(admin.ModelAdmin):
         'status', 'access_level', 'category', 'projects', 'is_featured', 
         'created_at'
     ]
-    search_fields = ['title', 'description', 'abstract', 'tags', 'keywords', 'projects__title']
+    search_fields = ['title', 'description', 'abstract', 'projects__title']
     list_editable = ['status', 'access_level', 'is_featured']
     readonly_fields = ['download_count', 'view_count', 'created_at', 'updated_at', 'published_at']
     filter_horizontal = ['contributors', 'related_datasets', 'projects']
@@ -104,6 +104,14 @@ class DatasetAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('owner', 'category').prefetch_related('contributors', 'projects')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Tags are matched one by one, as icontains on the array would match
+        # its '{a,b}' text form
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            results |= queryset.search(search_term)
+        return results, may_have_duplicates
     
     def projects_display(self, obj):
         """Display projects as a comma-separated list"""
@@ -122,19 +130,11 @@ class DatasetVersionAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at']
     ordering = ['-created_at']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_relations()
+
     def file_size_display(self, obj):
-        if obj.file_size == 0:
-            return "0 B"
-        
-        size_names = ["B", "KB", "MB", "GB", "TB"]
-        i = 0
-        size = obj.file_size
-        
-        while size >= 1024 and i < len(size_names) - 1:
-            size /= 1024
-            i += 1
-        
-        return f"{size:.1f} {size_names[i]}"
+        return format_file_size(obj.file_size)
     file_size_display.short_description = 'File Size'
 
 
@@ -5,10 +5,3 @@ class DatasetsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'datasets'
     verbose_name = 'Datasets'
-    
-    def ready(self):
-        # Import signal handlers
-        try:
-            import datasets.signals
-        except ImportError:
-            pass
\ No newline at end of file
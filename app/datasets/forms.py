@@ -1,14 +1,45 @@
+import os
 from django import forms
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.forms import SimpleArrayField
+from django.forms.models import ModelChoiceIterator
 from django.db.models import Q
 from .models import Dataset, DatasetCategory, DatasetVersion, Comment, Publisher, DatasetAnalysis
 from projects.models import Project
 
 User = get_user_model()
 
+MAX_VERSION_FILE_SIZE = 10 << 30  # 10GB per uploaded file
+ANALYSIS_FILE_EXTENSIONS = (
+    '.pdf', '.html', '.png', '.jpg', '.jpeg', '.svg',
+    '.csv', '.xlsx', '.xls', '.json', '.ipynb', '.r', '.py', '.zip'
+)
+
+
+class DatasetTitleChoiceIterator(ModelChoiceIterator):
+    """Yield (pk, title) choices straight from the database without building Dataset instances"""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        queryset = self.queryset.values_list('pk', 'title')
+        # Stream large result sets instead of caching them on the queryset
+        if not queryset._prefetch_related_lookups:
+            queryset = queryset.iterator(chunk_size=2000)
+        for pk, title in queryset:
+            yield (pk, title)
+
 
 class DatasetForm(forms.ModelForm):
     """Form for creating and editing datasets"""
+    tags = SimpleArrayField(
+        forms.CharField(required=False),
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Enter tags separated by commas'
+        })
+    )
     
     class Meta:
         model = Dataset
@@ -33,10 +64,6 @@ class DatasetForm(forms.ModelForm):
                 'placeholder': 'Brief summary of the dataset'
             }),
             'category': forms.Select(attrs={'class': 'form-select'}),
-            'tags': forms.TextInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'Enter tags separated by commas'
-            }),
             'status': forms.Select(attrs={'class': 'form-select'}),
             'access_level': forms.Select(attrs={'class': 'form-select'}),
             'license': forms.TextInput(attrs={
@@ -88,6 +115,7 @@ class DatasetForm(forms.ModelForm):
         self.fields['publisher'].empty_label = "Select a publisher..."
         
         # Configure related datasets queryset
+        self.fields['related_datasets'].iterator = DatasetTitleChoiceIterator
         if self.instance.pk:
             # When editing, exclude the current dataset from related datasets
             self.fields['related_datasets'].queryset = Dataset.objects.exclude(pk=self.instance.pk)
@@ -110,14 +138,13 @@ class DatasetForm(forms.ModelForm):
             self.fields['projects'].queryset = Project.objects.none()
 
     def clean_tags(self):
-        tags = self.cleaned_data.get('tags')
-        if tags:
-            # Clean and validate tags
-            tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
-            if len(tag_list) > 10:
-                raise forms.ValidationError('Maximum 10 tags allowed.')
-            return ', '.join(tag_list)
-        return tags
+        # Drop empty entries left by stray commas
+        tag_list = [tag for tag in self.cleaned_data.get('tags') or [] if tag]
+        if len(tag_list) > 10:
+            raise forms.ValidationError('Maximum 10 tags allowed.')
+        if any(len(tag) > 50 for tag in tag_list):
+            raise forms.ValidationError('Tags can be at most 50 characters long.')
+        return tag_list
 
 
 class DatasetFilterForm(forms.Form):
@@ -325,13 +352,16 @@ class DatasetVersionForm(forms.ModelForm):
             if file_size_text:
                 raise forms.ValidationError('File size will be calculated automatically when uploading.')
             
-            for upload in uploaded_files:
-                max_file_size = 10 * 1024 * 1024 * 1024  # 10GB
-                if upload.size > max_file_size:
-                    size_gb = upload.size / (1024 * 1024 * 1024)
-                    self.add_error('files', f'File "{upload.name}" ({size_gb:.2f} GB) exceeds the 10GB size limit.')
-                    raise forms.ValidationError('Each uploaded file must be 10GB or smaller.')
-                total_upload_size += upload.size
+            sizes = [upload.size for upload in uploaded_files]
+            if any(size > MAX_VERSION_FILE_SIZE for size in sizes):
+                oversized = ', '.join(
+                    f'"{upload.name}" ({size / (1 << 30):.2f} GB)'
+                    for upload, size in zip(uploaded_files, sizes)
+                    if size > MAX_VERSION_FILE_SIZE
+                )
+                self.add_error('files', f'Files exceeding the 10GB size limit: {oversized}.')
+                raise forms.ValidationError('Each uploaded file must be 10GB or smaller.')
+            total_upload_size = sum(sizes)
             
             # Update file_size field with total upload size
             self.instance.file_size = total_upload_size
@@ -442,9 +472,10 @@ class CommentForm(forms.ModelForm):
     
     def clean_content(self):
         content = self.cleaned_data.get('content')
-        if content and len(content.strip()) < 10:
+        stripped = content.strip() if content else ''
+        if content and len(stripped) < 10:
             raise forms.ValidationError('Comment must be at least 10 characters long.')
-        return content.strip()
+        return stripped
 
 
 class CommentEditForm(forms.ModelForm):
@@ -464,9 +495,10 @@ class CommentEditForm(forms.ModelForm):
     
     def clean_content(self):
         content = self.cleaned_data.get('content')
-        if content and len(content.strip()) < 10:
+        stripped = content.strip() if content else ''
+        if content and len(stripped) < 10:
             raise forms.ValidationError('Comment must be at least 10 characters long.')
-        return content.strip()
+        return stripped
 
 
 class PublisherForm(forms.ModelForm):
@@ -547,7 +579,6 @@ class DatasetProjectAssignmentForm(forms.Form):
         
         if user:
             # Show projects where user is owner or collaborator, or all projects if superuser
-            from projects.models import Project
             if user.is_superuser:
                 self.fields['projects'].queryset = Project.objects.all().order_by('title')
             else:
@@ -557,7 +588,7 @@ class DatasetProjectAssignmentForm(forms.Form):
             
             # Pre-select current projects if editing
             if dataset and dataset.pk:
-                self.fields['projects'].initial = dataset.projects.all()
+                self.fields['projects'].initial = list(dataset.projects.values_list('pk', flat=True))
 
 
 class DatasetAnalysisForm(forms.ModelForm):
@@ -600,15 +631,10 @@ class DatasetAnalysisForm(forms.ModelForm):
                 raise forms.ValidationError('File size exceeds the 100MB limit.')
             
             # Check file extension
-            allowed_extensions = [
-                '.pdf', '.html', '.png', '.jpg', '.jpeg', '.svg',
-                '.csv', '.xlsx', '.xls', '.json', '.ipynb', '.r', '.py', '.zip'
-            ]
-            import os
             _, ext = os.path.splitext(file.name)
-            if ext.lower() not in allowed_extensions:
+            if ext.lower() not in ANALYSIS_FILE_EXTENSIONS:
                 raise forms.ValidationError(
-                    f'File type "{ext}" is not allowed. Allowed types: {", ".join(allowed_extensions)}'
+                    f'File type "{ext}" is not allowed. Allowed types: {", ".join(ANALYSIS_FILE_EXTENSIONS)}'
                 )
         return file
     
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-16 16:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0025_remove_dataset_uuid_alter_comment_dataset_and_more'),
+        ('projects', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['title'], name='datasets_da_title_850589_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-16 16:52
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0026_add_dataset_sort_indexes'),
+    ]
+
+    operations = [
+        # Step 1: Add the array column next to the comma-separated one
+        migrations.AddField(
+            model_name='dataset',
+            name='tags_list',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(), blank=True, default=list, size=None),
+        ),
+
+        # Step 2: Split, trim and copy the existing tags without shortening them
+        migrations.RunSQL(
+            sql="""
+                UPDATE datasets_dataset
+                SET tags_list = ARRAY(
+                    SELECT btrim(tag)
+                    FROM unnest(string_to_array(tags, ',')) AS tag
+                    WHERE btrim(tag) <> ''
+                );
+            """,
+            reverse_sql="""
+                UPDATE datasets_dataset
+                SET tags = array_to_string(tags_list, ', ');
+            """,
+        ),
+
+        # Step 3: Replace the old column with the array column
+        migrations.RemoveField(
+            model_name='dataset',
+            name='tags',
+        ),
+        migrations.RenameField(
+            model_name='dataset',
+            old_name='tags_list',
+            new_name='tags',
+        ),
+        migrations.AlterField(
+            model_name='dataset',
+            name='tags',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(), blank=True, default=list, help_text='Tags', size=None),
+        ),
+
+        # Step 4: Index tags for containment lookups
+        migrations.AddIndex(
+            model_name='dataset',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tags'], name='dataset_tags_gin'),
+        ),
+    ]
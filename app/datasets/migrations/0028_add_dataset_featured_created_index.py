@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-16 17:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0027_dataset_tags_array'),
+        ('projects', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['-is_featured', '-created_at'], name='datasets_da_is_feat_accaa8_idx'),
+        ),
+    ]
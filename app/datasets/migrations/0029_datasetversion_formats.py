@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-16 17:09
+
+import os
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of the format detection in datasets.models at the time of this
+# migration, so later changes to the app code do not alter the backfill
+URL_FORMAT_EXTENSIONS = (
+    '.csv', '.json', '.xlsx', '.xls', '.txt', '.zip', '.tar.gz', '.gpkg',
+    '.shp', '.shx', '.dbf', '.prj', '.sbn', '.sbx', '.shp.xml', '.cpg',
+    '.geojson', '.kml', '.kmz', '.tif', '.tiff', '.jpg', '.jpeg', '.png', '.img',
+    '.gdb', '.mdb', '.lyr', '.lyrx', '.mpk', '.mpkx', '.qgs', '.qgz', '.qml',
+    '.sqlite', '.sql', '.sav', '.zsav', '.por', '.dta', '.rds', '.pdf',
+)
+URL_FORMAT_RE = re.compile(
+    r'\.(%s)(?=$|[?#])' % '|'.join(
+        re.escape(ext[1:]) for ext in sorted(URL_FORMAT_EXTENSIONS, key=len, reverse=True)
+    ),
+    re.IGNORECASE,
+)
+
+
+def get_file_formats(file_names=(), file_url=''):
+    """Return the upper-case formats of stored file names and an external URL"""
+    formats = set()
+    for name in file_names:
+        _, ext = os.path.splitext(name)
+        if ext:
+            formats.add(ext[1:].upper())
+    if file_url:
+        match = URL_FORMAT_RE.search(file_url)
+        if match:
+            formats.add(match.group(1).upper())
+    return formats
+
+
+def populate_version_formats(apps, schema_editor):
+    """Store the formats of existing versions and their attachments"""
+    DatasetVersion = apps.get_model('datasets', 'DatasetVersion')
+    DatasetVersionFile = apps.get_model('datasets', 'DatasetVersionFile')
+
+    attachment_names = {}
+    for version_id, name in DatasetVersionFile.objects.values_list('version_id', 'file'):
+        attachment_names.setdefault(version_id, []).append(name)
+
+    versions = list(DatasetVersion.objects.only('id', 'file', 'file_url'))
+    for version in versions:
+        file_names = attachment_names.get(version.pk, [])
+        if version.file:
+            file_names.append(version.file.name)
+        version.formats = sorted(get_file_formats(file_names, version.file_url))
+    DatasetVersion.objects.bulk_update(versions, ['formats'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0028_add_dataset_featured_created_index'),
+    ]
+
+    operations = [
+        # Step 1: Add formats field
+        migrations.AddField(
+            model_name='datasetversion',
+            name='formats',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='File formats of this version and its attachments'),
+        ),
+
+        # Step 2: Populate formats for existing versions
+        migrations.RunPython(
+            populate_version_formats,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-16 17:15
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Concurrent index operations cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('datasets', '0029_datasetversion_formats'),
+        ('projects', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='dataset',
+            index=models.Index(fields=['owner', '-created_at'], name='datasets_da_owner_i_8bc803_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='dataset',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['-created_at'], name='ds_pub_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='dataset',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['-download_count'], name='ds_pub_popular_idx'),
+        ),
+    ]
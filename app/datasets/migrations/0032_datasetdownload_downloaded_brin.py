@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-16 17:30
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0031_datasetdownload_drop_fk_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='datasetdownload',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['downloaded_at'], name='download_downloaded_brin'),
+        ),
+    ]
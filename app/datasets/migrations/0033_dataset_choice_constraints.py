@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-16 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0032_datasetdownload_downloaded_brin'),
+        ('projects', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='dataset',
+            constraint=models.CheckConstraint(condition=models.Q(('status__in', ['draft', 'published', 'archived', 'private'])), name='dataset_status_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='dataset',
+            constraint=models.CheckConstraint(condition=models.Q(('access_level__in', ['public', 'restricted', 'private'])), name='dataset_access_level_valid'),
+        ),
+    ]
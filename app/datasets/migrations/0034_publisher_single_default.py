@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-16 18:16
+
+from django.db import migrations, models
+
+
+def keep_single_default(apps, schema_editor):
+    """Keep only the most recently updated default publisher"""
+    Publisher = apps.get_model('datasets', 'Publisher')
+    defaults = Publisher.objects.filter(is_default=True)
+    latest = defaults.order_by('-updated_at', '-pk').values_list('pk', flat=True).first()
+    if latest is not None:
+        defaults.exclude(pk=latest).update(is_default=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0033_dataset_choice_constraints'),
+    ]
+
+    operations = [
+        # Step 1: Resolve duplicate defaults left by concurrent saves
+        migrations.RunPython(
+            keep_single_default,
+            migrations.RunPython.noop,
+        ),
+
+        # Step 2: Let the database enforce a single default publisher
+        migrations.AddConstraint(
+            model_name='publisher',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=('is_default',), name='publisher_single_default'),
+        ),
+    ]
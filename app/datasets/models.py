@@ -1,35 +1,83 @@
 import os
+import re
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from auditlog.registry import auditlog
 from auditlog.models import AuditlogHistoryField
 
 User = get_user_model()
 
-
+FILE_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+# Extensions recognised in external file URLs
+URL_FORMAT_EXTENSIONS = (
+    '.csv', '.json', '.xlsx', '.xls', '.txt', '.zip', '.tar.gz', '.gpkg',
+    '.shp', '.shx', '.dbf', '.prj', '.sbn', '.sbx', '.shp.xml', '.cpg',
+    '.geojson', '.kml', '.kmz', '.tif', '.tiff', '.jpg', '.jpeg', '.png', '.img',
+    '.gdb', '.mdb', '.lyr', '.lyrx', '.mpk', '.mpkx', '.qgs', '.qgz', '.qml',
+    '.sqlite', '.sql', '.sav', '.zsav', '.por', '.dta', '.rds', '.pdf',
+)
+# Matches a supported extension at the end of the URL path; longer extensions
+# are tried first so "data.tar.gz" and "map.geojson" are not cut short
+URL_FORMAT_RE = re.compile(
+    r'\.(%s)(?=$|[?#])' % '|'.join(
+        re.escape(ext[1:]) for ext in sorted(URL_FORMAT_EXTENSIONS, key=len, reverse=True)
+    ),
+    re.IGNORECASE,
+)
+
+
+def format_file_size(num_bytes):
+    """Return a human-readable size such as "1.5 MB" for a byte count"""
+    if num_bytes <= 0:
+        return "0 B"
+    # Each unit step is 2**10, so the bit length picks the unit directly
+    unit = min((num_bytes.bit_length() - 1) // 10, len(FILE_SIZE_UNITS) - 1)
+    return f"{num_bytes / (1 << (10 * unit)):.1f} {FILE_SIZE_UNITS[unit]}"
+
+
+def get_file_formats(file_names=(), file_url=''):
+    """Return the upper-case formats (e.g. "CSV") of stored file names and an external URL"""
+    formats = set()
+    for name in file_names:
+        _, ext = os.path.splitext(name)
+        if ext:
+            formats.add(ext[1:].upper())
+    if file_url:
+        match = URL_FORMAT_RE.search(file_url)
+        if match:
+            formats.add(match.group(1).upper())
+    return formats
+
+
+def build_upload_path(subdir, timestamp, filename):
+    """Return datasets/{subdir}/YYYY/MM/DD/{filename} for an upload made at the given time"""
+    # Re-saved instances keep the directory of their original upload date
+    return f"datasets/{subdir}/{timestamp or timezone.now():%Y/%m/%d}/{filename}"
+
+
+# This and the following upload_to callables stay module-level functions so
+# migrations can reference them
 def dataset_version_upload_path(instance, filename):
     """
     Custom upload path for dataset version files.
     Includes dataset ID in the filename to avoid conflicts.
     Format: datasets/versions/YYYY/MM/DD/dataset_{id}_version_{version}_{filename}
     """
-    # Get the current date for directory structure
-    now = timezone.now()
-    year = now.strftime('%Y')
-    month = now.strftime('%m')
-    day = now.strftime('%d')
-    
-    # Get file extension
-    _, ext = os.path.splitext(filename)
-    
-    # Create filename with dataset ID and version number
-    safe_filename = f"dataset_{instance.dataset.id}_version_{instance.version_number}_{filename}"
-    
-    # Return the full path
-    return f'datasets/versions/{year}/{month}/{day}/{safe_filename}'
+    return build_upload_path(
+        'versions',
+        instance.created_at,
+        f"dataset_{instance.dataset_id}_version_{instance.version_number}_{filename}",
+    )
 
 
 def dataset_version_attachment_upload_path(instance, filename):
@@ -37,18 +85,12 @@ def dataset_version_attachment_upload_path(instance, filename):
     Upload path for additional files associated with a dataset version.
     Mirrors the main dataset version upload path but uses the DatasetVersionFile instance.
     """
-    now = timezone.now()
-    year = now.strftime('%Y')
-    month = now.strftime('%m')
-    day = now.strftime('%d')
-    
-    dataset_id = instance.version.dataset.id
-    version_number = instance.version.version_number
-    
-    safe_filename = f"dataset_{dataset_id}_version_{version_number}_{filename}"
-    
-    # Return the full path
-    return f'datasets/versions/{year}/{month}/{day}/{safe_filename}'
+    version = instance.version
+    return build_upload_path(
+        'versions',
+        instance.uploaded_at,
+        f"dataset_{version.dataset_id}_version_{version.version_number}_{filename}",
+    )
 
 
 def dataset_analysis_upload_path(instance, filename):
@@ -56,16 +98,7 @@ def dataset_analysis_upload_path(instance, filename):
     Custom upload path for dataset analysis/dataviz files.
     Format: datasets/analysis/YYYY/MM/DD/dataset_{id}_{filename}
     """
-    now = timezone.now()
-    year = now.strftime('%Y')
-    month = now.strftime('%m')
-    day = now.strftime('%d')
-    
-    dataset_id = instance.dataset.id
-    
-    safe_filename = f"dataset_{dataset_id}_{filename}"
-    
-    return f'datasets/analysis/{year}/{month}/{day}/{safe_filename}'
+    return build_upload_path('analysis', instance.uploaded_at, f"dataset_{instance.dataset_id}_{filename}")
 
 
 class Publisher(models.Model):
@@ -103,15 +136,53 @@ class Publisher(models.Model):
         verbose_name = _('Publisher')
         verbose_name_plural = _('Publishers')
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['is_default'],
+                condition=models.Q(is_default=True),
+                name='publisher_single_default',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember whether the stored row is the default (None when deferred)
+        instance._stored_is_default = instance.__dict__.get('is_default')
+        return instance
+
+    def validate_constraints(self, exclude=None):
+        # save() demotes the current default before writing a new one, so the
+        # single-default constraint is left to the database instead of forms
+        exclude = set(exclude or ()) | {'is_default'}
+        super().validate_constraints(exclude=exclude)
+
     def save(self, *args, **kwargs):
-        # Ensure only one default publisher
-        if self.is_default:
-            Publisher.objects.filter(is_default=True).update(is_default=False)
-        super().save(*args, **kwargs)
+        if not self.is_default:
+            super().save(*args, **kwargs)
+        elif getattr(self, '_stored_is_default', False):
+            # Already the default when loaded, so no other row should need
+            # demoting; if another publisher took over since, demote it after all
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+            except IntegrityError:
+                self._save_as_default(*args, **kwargs)
+        else:
+            self._save_as_default(*args, **kwargs)
+        self._stored_is_default = self.is_default
+
+    def _save_as_default(self, *args, **kwargs):
+        # The demotion and the save share one transaction. Two publishers
+        # promoted concurrently can both pass the demotion, so the partial
+        # unique constraint rejects the second commit instead of keeping
+        # two defaults
+        with transaction.atomic():
+            Publisher.objects.filter(is_default=True).exclude(pk=self.pk).update(is_default=False)
+            super().save(*args, **kwargs)
 
 
 class DatasetCategory(models.Model):
@@ -131,6 +202,73 @@ class DatasetCategory(models.Model):
         return self.name
 
 
+class DatasetQuerySet(models.QuerySet):
+    """Query helpers for datasets"""
+
+    def with_related(self):
+        """Load owner, category, contributors and versions for list rendering"""
+        return self.select_related('owner', 'category').prefetch_related(
+            'contributors',
+            models.Prefetch(
+                'versions',
+                queryset=DatasetVersion.objects.select_related('created_by').prefetch_related('files'),
+            ),
+        )
+
+    def for_list(self):
+        """Skip the long text fields that list pages do not render"""
+        return self.defer('description', 'citation')
+
+    def search(self, text):
+        """Match the text in the title, description, abstract or any single tag"""
+        # icontains on the array would match its '{a,b}' text form, so each tag
+        # is compared on its own; LIKE wildcards in the text are escaped
+        pattern = '%' + re.sub(r'([\\%_])', r'\\\1', text) + '%'
+        tag_match = RawSQL(
+            f'EXISTS (SELECT 1 FROM unnest("{self.model._meta.db_table}"."tags") AS tag WHERE tag ILIKE %s)',
+            (pattern,),
+            output_field=models.BooleanField(),
+        )
+        return self.filter(
+            models.Q(title__icontains=text) |
+            models.Q(description__icontains=text) |
+            models.Q(abstract__icontains=text) |
+            models.Q(tag_match)
+        )
+
+    def with_formats(self):
+        """Annotate the distinct formats and the number of versions in the same query"""
+        version_count = DatasetVersion.objects.filter(dataset=models.OuterRef('pk')).order_by().values(
+            'dataset'
+        ).annotate(count=models.Count('pk')).values('count')
+        version_formats = DatasetVersion.objects.filter(dataset=models.OuterRef('pk')).annotate(
+            format=models.Func(
+                models.F('formats'),
+                function='jsonb_array_elements_text',
+                output_field=models.CharField(),
+            ),
+        ).order_by('format').values('format').distinct()
+        # The annotation is stored in place of the available_formats cached property
+        return self.annotate(
+            available_formats=ArraySubquery(version_formats),
+            version_count=Coalesce(models.Subquery(version_count), 0),
+        )
+
+    def visible_to(self, user):
+        """Annotate each dataset with whether the user may access it, mirroring is_accessible_by"""
+        is_authenticated = bool(user and user.is_authenticated)
+        conditions = [models.When(access_level='public', then=models.Value(True))]
+        if is_authenticated:
+            conditions.append(models.When(access_level='restricted', then=models.Value(True)))
+            if user.is_superuser:
+                conditions.append(models.When(access_level='private', then=models.Value(True)))
+            else:
+                conditions.append(models.When(access_level='private', owner_id=user.pk, then=models.Value(True)))
+        return self.annotate(
+            accessible=models.Case(*conditions, default=models.Value(False), output_field=models.BooleanField())
+        )
+
+
 class Dataset(models.Model):
     """Main dataset model"""
     STATUS_CHOICES = [
@@ -170,7 +308,8 @@ class Dataset(models.Model):
         blank=True,
         related_name='datasets'
     )
-    tags = models.CharField(max_length=500, blank=True, help_text='Comma-separated tags')
+    # Tag length is limited by the form so existing longer tags are kept intact
+    tags = ArrayField(models.CharField(), default=list, blank=True, help_text='Tags')
     
     # Access and permissions
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
@@ -237,6 +376,8 @@ class Dataset(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     published_at = models.DateTimeField(null=True, blank=True)
+
+    objects = DatasetQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
@@ -244,7 +385,25 @@ class Dataset(models.Model):
             models.Index(fields=['status', 'access_level']),
             models.Index(fields=['category', 'status']),
             models.Index(fields=['owner', 'status']),
+            models.Index(fields=['owner', '-created_at']),
             models.Index(fields=['created_at']),
+            # Partial indexes for the published listings on the home page
+            models.Index(fields=['-created_at'], condition=models.Q(status='published'), name='ds_pub_recent_idx'),
+            models.Index(fields=['-download_count'], condition=models.Q(status='published'), name='ds_pub_popular_idx'),
+            models.Index(fields=['-is_featured', '-created_at']),
+            models.Index(fields=['title']),
+            GinIndex(fields=['tags'], name='dataset_tags_gin'),
+        ]
+        # Mirror STATUS_CHOICES and ACCESS_LEVEL_CHOICES in the database
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(status__in=['draft', 'published', 'archived', 'private']),
+                name='dataset_status_valid',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(access_level__in=['public', 'restricted', 'private']),
+                name='dataset_access_level_valid',
+            ),
         ]
 
     def __str__(self):
@@ -254,28 +413,29 @@ class Dataset(models.Model):
         # Set published_at when status changes to published
         if self.status == 'published' and not self.published_at:
             self.published_at = timezone.now()
+            # Partial saves must still write the new publication date
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'published_at'}
         super().save(*args, **kwargs)
 
     def get_file_size_display(self):
         """Return human-readable file size"""
-        if self.file_size == 0:
-            return "0 B"
-        
-        size_names = ["B", "KB", "MB", "GB", "TB"]
-        i = 0
-        size = self.file_size
-        
-        while size >= 1024 and i < len(size_names) - 1:
-            size /= 1024
-            i += 1
-        
-        return f"{size:.1f} {size_names[i]}"
+        return format_file_size(self.file_size)
+
+    @classmethod
+    def increment_views(cls, pk):
+        """Atomically increment the view counter of a dataset"""
+        return cls.objects.filter(pk=pk).update(view_count=models.F('view_count') + 1)
+
+    @classmethod
+    def increment_downloads(cls, pk):
+        """Atomically increment the download counter of a dataset"""
+        return cls.objects.filter(pk=pk).update(download_count=models.F('download_count') + 1)
 
     def get_tags_list(self):
         """Return tags as a list"""
-        if not self.tags:
-            return []
-        return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
+        return self.tags or []
 
     def is_accessible_by(self, user):
         """Check if user can access this dataset"""
@@ -289,46 +449,24 @@ class Dataset(models.Model):
 
     def get_available_formats(self):
         """Get list of available data formats from dataset versions"""
-        import os
+        return self.available_formats
+
+    @cached_property
+    def available_formats(self):
+        """Formats of all versions, read from their stored format lists once per instance"""
         formats = set()
-        
+        # Iterates the prefetch cache when loaded via with_related()
         for version in self.versions.all():
-            if version.file:
-                # Get file extension
-                _, ext = os.path.splitext(version.file.name)
-                if ext:
-                    # Remove the dot and convert to uppercase
-                    format_name = ext[1:].upper()
-                    formats.add(format_name)
-            # Include additional uploaded files
-            if hasattr(version, 'files'):
-                for attachment in version.files.all():
-                    _, ext = os.path.splitext(attachment.file.name)
-                    if ext:
-                        format_name = ext[1:].upper()
-                        formats.add(format_name)
-            if version.file_url:
-                # For external URLs, try to extract format from URL
-                url_lower = version.file_url.lower()
-                supported_extensions = [
-                    '.csv', '.json', '.xlsx', '.xls', '.txt', '.zip', '.tar.gz', '.gpkg',
-                    '.shp', '.shx', '.dbf', '.prj', '.sbn', '.sbx', '.shp.xml', '.cpg',
-                    '.geojson', '.kml', '.kmz', '.tif', '.tiff', '.jpg', '.jpeg', '.png', '.img',
-                    '.gdb', '.mdb', '.lyr', '.lyrx', '.mpk', '.mpkx', '.qgs', '.qgz', '.qml',
-                    '.sqlite', '.sql', '.sav', '.zsav', '.por', '.dta', '.rds', '.pdf'
-                ]
-                if any(ext in url_lower for ext in supported_extensions):
-                    for ext in supported_extensions:
-                        if ext in url_lower:
-                            format_name = ext[1:].upper()
-                            if ext == '.tar.gz':
-                                format_name = 'TAR.GZ'
-                            elif ext == '.shp.xml':
-                                format_name = 'SHP.XML'
-                            formats.add(format_name)
-                            break
-        
-        return sorted(list(formats))
+            formats.update(version.formats)
+        return sorted(formats)
+
+
+class DatasetVersionQuerySet(models.QuerySet):
+    """Query helpers for dataset versions"""
+
+    def with_relations(self):
+        """Join the dataset and creator used by admin listings and reports"""
+        return self.select_related('dataset', 'created_by')
 
 
 class DatasetVersion(models.Model):
@@ -348,6 +486,9 @@ class DatasetVersion(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     is_current = models.BooleanField(default=False)
+    formats = models.JSONField(default=list, blank=True, editable=False, help_text='File formats of this version and its attachments')
+
+    objects = DatasetVersionQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
@@ -355,45 +496,64 @@ class DatasetVersion(models.Model):
 
     def __str__(self):
         return f"{self.dataset.title} v{self.version_number}"
+
+    def save(self, *args, **kwargs):
+        # Keep the stored formats in sync with the file and URL
+        self.formats = self.compute_formats()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'formats'}
+        super().save(*args, **kwargs)
+
+    def compute_formats(self):
+        """Return the sorted formats of the version file, its attachments and external URL"""
+        file_names = [self.file.name] if self.file else []
+        if not self._state.adding:
+            file_names.extend(self.files.values_list('file', flat=True))
+        return sorted(get_file_formats(file_names, self.file_url))
+
+    def refresh_formats(self):
+        """Recompute and store formats after attachments change"""
+        self.formats = self.compute_formats()
+        DatasetVersion.objects.filter(pk=self.pk).update(formats=self.formats)
     
     def get_file_size_display(self):
         """Return human-readable file size"""
         if self.file_size_text:
             return self.file_size_text
-        attachments_manager = getattr(self, 'files', None)
-        if attachments_manager and attachments_manager.exists():
-            attachments = list(attachments_manager.all())
-            total_size = self.file_size or sum(f.file_size for f in attachments)
-            size_names = ["B", "KB", "MB", "GB", "TB"]
-            i = 0
-            size = total_size
-            
-            while size >= 1024 and i < len(size_names) - 1:
-                size /= 1024
-                i += 1
-            
-            human_size = f"{size:.1f} {size_names[i]}"
-            count = len(attachments)
-            return f"{count} file{'s' if count != 1 else ''}, {human_size}"
+        count, attachments_size = self.get_attachment_totals()
+        if count:
+            total_size = self.file_size or attachments_size
+            return f"{count} file{'s' if count != 1 else ''}, {format_file_size(total_size)}"
         elif self.file_size > 0:
-            size_names = ["B", "KB", "MB", "GB", "TB"]
-            i = 0
-            size = self.file_size
-            
-            while size >= 1024 and i < len(size_names) - 1:
-                size /= 1024
-                i += 1
-            
-            return f"{size:.1f} {size_names[i]}"
+            return format_file_size(self.file_size)
         return "Unknown size"
     
+    def get_attachment_totals(self):
+        """Return the number and total size of the attached files"""
+        if self.pk is None:
+            return 0, 0
+        # Reuse prefetched attachments, otherwise let the database do the sum
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('files')
+        if prefetched is not None:
+            return len(prefetched), sum(f.file_size for f in prefetched)
+        totals = self.files.aggregate(
+            count=models.Count('id'),
+            total=Coalesce(models.Sum('file_size'), 0),
+        )
+        return totals['count'], totals['total']
+
     def has_file(self):
         """Check if version has either uploaded file, external URL, or URL description"""
-        if self.file:
+        # Read the stored file name directly instead of building a FieldFile
+        # (unless the field was deferred), and leave the attachment query for last
+        stored_file = self.__dict__['file'] if 'file' in self.__dict__ else self.file
+        if stored_file or self.file_url or self.file_url_description:
             return True
-        if hasattr(self, 'files') and self.files.exists():
-            return True
-        return bool(self.file_url or self.file_url_description)
+        if self.pk is None:
+            return False
+        # Reads the prefetch cache when files were prefetched
+        return self.files.exists()
 
 
 class DatasetVersionFile(models.Model):
@@ -421,19 +581,50 @@ class DatasetVersionFile(models.Model):
             return self.original_name
         return os.path.basename(self.file.name)
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.version.refresh_formats()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.version.refresh_formats()
+        return result
+
+    @classmethod
+    def bulk_attach(cls, version, uploaded_files, batch_size=1000):
+        """Attach uploaded files to a version using batched inserts
+
+        Prefer this over saving attachments one at a time. bulk_create skips
+        save() and signals, so the formats are refreshed once for the batch
+        and no per-file audit entries are written.
+        """
+        attachments = cls.objects.bulk_create(
+            [
+                cls(version=version, file=upload, file_size=upload.size, original_name=upload.name)
+                for upload in uploaded_files
+            ],
+            batch_size=batch_size,
+        )
+        version.refresh_formats()
+        return attachments
+
 
 class DatasetDownload(models.Model):
     """Track dataset downloads"""
+    # Lookups are served by the composite indexes below, so the foreign keys
+    # skip their own single-column indexes
     dataset = models.ForeignKey(
         Dataset, 
         on_delete=models.CASCADE, 
-        related_name='downloads'
+        related_name='downloads',
+        db_index=False
     )
     user = models.ForeignKey(
         User, 
         on_delete=models.SET_NULL, 
         null=True, 
-        blank=True
+        blank=True,
+        db_index=False
     )
     ip_address = models.GenericIPAddressField()
     user_agent = models.TextField(blank=True)
@@ -444,6 +635,8 @@ class DatasetDownload(models.Model):
         indexes = [
             models.Index(fields=['dataset', 'downloaded_at']),
             models.Index(fields=['user', 'downloaded_at']),
+            # Rows arrive in time order, so a tiny BRIN index covers date ranges
+            BrinIndex(fields=['downloaded_at'], name='download_downloaded_brin'),
         ]
 
     def __str__(self):
@@ -554,18 +747,7 @@ class DatasetAnalysis(models.Model):
     
     def get_file_size_display(self):
         """Return human-readable file size"""
-        if self.file_size == 0:
-            return "0 B"
-        
-        size_names = ["B", "KB", "MB", "GB", "TB"]
-        i = 0
-        size = self.file_size
-        
-        while size >= 1024 and i < len(size_names) - 1:
-            size /= 1024
-            i += 1
-        
-        return f"{size:.1f} {size_names[i]}"
+        return format_file_size(self.file_size)
     
     def can_delete(self, user):
         """Check if user can delete this analysis"""
@@ -578,11 +760,17 @@ class DatasetAnalysis(models.Model):
 
 
 # Register models for audit logging
-auditlog.register(Publisher)
-auditlog.register(Dataset)
-auditlog.register(DatasetCategory)
-auditlog.register(DatasetVersion)
+# updated_at changes on every save, so leaving it out means unchanged saves
+# write no audit entry at all
+auditlog.register(Publisher, exclude_fields=['updated_at'])
+# Large text fields and hot counters are left out to keep audit rows small
+auditlog.register(
+    Dataset,
+    exclude_fields=['description', 'abstract', 'citation', 'download_count', 'view_count', 'updated_at'],
+)
+auditlog.register(DatasetCategory, exclude_fields=['updated_at'])
+auditlog.register(DatasetVersion, exclude_fields=['description', 'file_url_description', 'formats'])
 auditlog.register(DatasetVersionFile)
-auditlog.register(Comment)
-auditlog.register(DatasetDownload)
-auditlog.register(DatasetAnalysis)
\ No newline at end of file
+auditlog.register(Comment, exclude_fields=['updated_at'])
+# DatasetDownload rows are already an append-only log and are not audited
+auditlog.register(DatasetAnalysis, exclude_fields=['updated_at'])
\ No newline at end of file
@@ -1,6 +1,10 @@
-from django.test import TestCase, override_settings, Client
+from django.test import SimpleTestCase, TestCase, override_settings, Client
+from django.test.utils import CaptureQueriesContext
+from django.db import IntegrityError, connection, transaction
 from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.contrib.messages import get_messages
 from django.template.loader import render_to_string
 from django.urls import reverse
@@ -8,7 +12,8 @@ from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.utils.datastructures import MultiValueDict
 from unittest.mock import patch, MagicMock
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+from smtplib import SMTPException
 from tempfile import TemporaryDirectory
 import uuid
 
@@ -21,6 +26,9 @@ from .models import (
     DatasetCategory,
     DatasetDownload,
     DatasetAnalysis,
+    format_file_size,
+    get_file_formats,
+    dataset_version_upload_path,
 )
 from .views import (
     send_comment_notification_email,
@@ -34,86 +42,127 @@ from .views import (
 )
 from .forms import (
     DatasetForm, DatasetVersionForm, CommentForm, CommentEditForm,
-    DatasetProjectAssignmentForm, DatasetAnalysisForm,
+    DatasetProjectAssignmentForm, DatasetAnalysisForm, PublisherForm,
 )
+from projects.models import Project
 
 User = get_user_model()
 
 
+STUB_EMAIL_TEMPLATES = {
+    'datasets/email/comment_notification.html': '{{ comment.content }}',
+    'datasets/email/comment_notification.txt': '{{ comment.content }}',
+    'datasets/email/dataset_update_notification.html': '{{ dataset.title }}',
+    'datasets/email/dataset_update_notification.txt': '{{ dataset.title }}',
+}
+
+# Serve the notification emails from memory where only the delivery path is tested
+stub_email_templates = override_settings(TEMPLATES=[{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'OPTIONS': {
+        'loaders': [('django.template.loaders.locmem.Loader', STUB_EMAIL_TEMPLATES)],
+    },
+}])
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """Email backend that rejects every message and records the attempts"""
+    attempts = []
+
+    def send_messages(self, email_messages):
+        FailingEmailBackend.attempts.extend(email_messages)
+        raise SMTPException('SMTP Error')
+
+
+class TemporaryMediaMixin:
+    """Point MEDIA_ROOT at a temporary directory for the whole test class"""
+
+    @classmethod
+    def setUpClass(cls):
+        # MEDIA_ROOT must point at the temporary directory before setUpTestData runs
+        cls.temp_media = TemporaryDirectory()
+        cls.addClassCleanup(cls.temp_media.cleanup)
+        cls.override_media = override_settings(MEDIA_ROOT=cls.temp_media.name)
+        cls.override_media.enable()
+        cls.addClassCleanup(cls.override_media.disable)
+        super().setUpClass()
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    DEFAULT_FROM_EMAIL='noreply@test.com',
+    SITE_NAME='Test Site',
+    SITE_URL='http://test.com'
+)
 class NotificationEmailTests(TestCase):
     """Test cases for email notification functions"""
     
-    def setUp(self):
-        """Set up test data"""
-        # Create test users
-        self.owner = User.objects.create_user(
-            username='owner',
-            email='owner@test.com',
-            password='testpass123',
-            notify_comments=True,
-            notify_dataset_updates=True,
-            notify_new_versions=True
-        )
-        
-        self.commenter = User.objects.create_user(
-            username='commenter',
-            email='commenter@test.com',
-            password='testpass123'
-        )
-        
-        self.other_user = User.objects.create_user(
-            username='other_user',
-            email='other@test.com',
-            password='testpass123',
-            notify_dataset_updates=True,
-            notify_new_versions=True
-        )
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data once for the whole class"""
+        # Create test users in one INSERT, hashing the shared password once
+        password = make_password('testpass123')
+        cls.owner, cls.commenter, cls.other_user = User.objects.bulk_create([
+            User(
+                username='owner',
+                email='owner@test.com',
+                password=password,
+                notify_comments=True,
+                notify_dataset_updates=True,
+                notify_new_versions=True
+            ),
+            User(
+                username='commenter',
+                email='commenter@test.com',
+                password=password,
+                first_login_date=timezone.now()
+            ),
+            User(
+                username='other_user',
+                email='other@test.com',
+                password=password,
+                notify_dataset_updates=True,
+                notify_new_versions=True
+            ),
+        ])
         
         # Create test publisher
-        self.publisher = Publisher.objects.create(
+        cls.publisher = Publisher.objects.create(
             name='Test Publisher',
             description='Test publisher for notifications'
         )
         
         # Create test dataset
-        self.dataset = Dataset.objects.create(
+        cls.dataset = Dataset.objects.create(
             title='Test Dataset',
             description='Test dataset for notifications',
             abstract='Test abstract',
-            owner=self.owner,
-            publisher=self.publisher,
+            owner=cls.owner,
+            publisher=cls.publisher,
             status='published',
             access_level='public'
         )
         
         # Create test dataset version
-        self.version = DatasetVersion.objects.create(
-            dataset=self.dataset,
+        cls.version = DatasetVersion.objects.create(
+            dataset=cls.dataset,
             version_number='1.0',
             description='Initial version',
-            created_by=self.owner
+            created_by=cls.owner
         )
         
         # Create test comment
-        self.comment = Comment.objects.create(
-            dataset=self.dataset,
-            author=self.commenter,
+        cls.comment = Comment.objects.create(
+            dataset=cls.dataset,
+            author=cls.commenter,
             content='Test comment for notifications'
         )
 
-    @override_settings(
-        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
-        DEFAULT_FROM_EMAIL='noreply@test.com',
-        SITE_NAME='Test Site',
-        SITE_URL='http://test.com'
-    )
     def test_send_comment_notification_email_success(self):
         """Test successful comment notification email sending"""
-        # Clear any existing emails
-        mail.outbox = []
-        
-        # Send notification
-        send_comment_notification_email(self.comment)
+        # Send notification; the comment already carries its relations
+        with self.assertNumQueries(0):
+            send_comment_notification_email(self.comment)
         
         # Check that email was sent
         self.assertEqual(len(mail.outbox), 1)
@@ -125,35 +174,40 @@ class NotificationEmailTests(TestCase):
         self.assertIn('Test comment for notifications', email.body)
         self.assertIn('Test Site', email.body)
 
+    def test_add_comment_view_query_count(self):
+        """Test that adding a comment loads the dataset owner with the dataset"""
+        self.client.force_login(self.commenter)
+        
+        # Session, user, dataset with owner, comment insert and its audit entry
+        with self.assertNumQueries(5):
+            response = self.client.post(
+                reverse('datasets:add_comment', kwargs={'dataset_id': self.dataset.id}),
+                {'content': 'A comment from the view'}
+            )
+        
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 1)
+
     def test_send_comment_notification_email_disabled(self):
         """Test that comment notification is not sent when disabled"""
         # Disable comment notifications for owner
         self.owner.notify_comments = False
         self.owner.save()
         
-        # Clear any existing emails
-        mail.outbox = []
-        
-        # Send notification
-        send_comment_notification_email(self.comment)
+        # Send notification; nothing is rendered or queried
+        with patch('django.template.loader.render_to_string') as mock_render, self.assertNumQueries(0):
+            send_comment_notification_email(self.comment)
         
         # Check that no email was sent
         self.assertEqual(len(mail.outbox), 0)
+        mock_render.assert_not_called()
 
 
-    @override_settings(
-        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
-        DEFAULT_FROM_EMAIL='noreply@test.com',
-        SITE_NAME='Test Site',
-        SITE_URL='http://test.com'
-    )
     def test_send_dataset_update_notification_email_success(self):
         """Test successful dataset update notification email sending"""
-        # Clear any existing emails
-        mail.outbox = []
-        
-        # Send notification
-        send_dataset_update_notification_email(self.dataset)
+        # Send notification; recipients are read in a single query
+        with self.assertNumQueries(1):
+            send_dataset_update_notification_email(self.dataset)
         
         # Check that emails were sent to users with notifications enabled
         self.assertEqual(len(mail.outbox), 2)  # owner and other_user
@@ -167,31 +221,23 @@ class NotificationEmailTests(TestCase):
 
     def test_send_dataset_update_notification_email_no_users(self):
         """Test that no emails are sent when no users have notifications enabled"""
-        # Disable notifications for all users
-        User.objects.filter(notify_dataset_updates=True).update(notify_dataset_updates=False)
-        
-        # Clear any existing emails
-        mail.outbox = []
+        # Disable notifications for the subscribed fixture users
+        User.objects.filter(
+            pk__in=[self.owner.pk, self.other_user.pk]
+        ).update(notify_dataset_updates=False)
         
-        # Send notification
-        send_dataset_update_notification_email(self.dataset)
+        # Send notification, which stops after the recipient lookup
+        with self.assertNumQueries(1):
+            send_dataset_update_notification_email(self.dataset)
         
         # Check that no emails were sent
         self.assertEqual(len(mail.outbox), 0)
 
-    @override_settings(
-        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
-        DEFAULT_FROM_EMAIL='noreply@test.com',
-        SITE_NAME='Test Site',
-        SITE_URL='http://test.com'
-    )
     def test_send_new_version_notification_email_success(self):
         """Test successful new version notification email sending"""
-        # Clear any existing emails
-        mail.outbox = []
-        
-        # Send notification
-        send_new_version_notification_email(self.dataset, self.version)
+        # Send notification; recipients are read in a single query
+        with self.assertNumQueries(1):
+            send_new_version_notification_email(self.dataset, self.version)
         
         # Check that emails were sent to users with notifications enabled
         self.assertEqual(len(mail.outbox), 2)  # owner and other_user
@@ -206,88 +252,260 @@ class NotificationEmailTests(TestCase):
 
     def test_send_new_version_notification_email_no_users(self):
         """Test that no emails are sent when no users have notifications enabled"""
-        # Disable notifications for all users
-        User.objects.filter(notify_new_versions=True).update(notify_new_versions=False)
-        
-        # Clear any existing emails
-        mail.outbox = []
+        # Disable notifications for the subscribed fixture users
+        User.objects.filter(
+            pk__in=[self.owner.pk, self.other_user.pk]
+        ).update(notify_new_versions=False)
         
-        # Send notification
-        send_new_version_notification_email(self.dataset, self.version)
+        # Send notification, which stops after the recipient lookup
+        with self.assertNumQueries(1):
+            send_new_version_notification_email(self.dataset, self.version)
         
         # Check that no emails were sent
         self.assertEqual(len(mail.outbox), 0)
 
-    @patch('django.core.mail.send_mail')
-    def test_send_comment_notification_email_exception_handling(self, mock_send_mail):
+    @stub_email_templates
+    @override_settings(EMAIL_BACKEND='datasets.tests.FailingEmailBackend')
+    def test_send_comment_notification_email_exception_handling(self):
         """Test exception handling in comment notification email"""
-        # Make send_mail raise an exception
-        mock_send_mail.side_effect = Exception('SMTP Error')
-        
-        # Clear any existing emails
-        mail.outbox = []
+        FailingEmailBackend.attempts = []
         
-        # Send notification (should not raise exception)
-        with self.assertRaises(Exception):
+        # The backend error is propagated to the caller
+        with self.assertRaises(SMTPException):
             send_comment_notification_email(self.comment)
         
-        # Check that send_mail was called
-        mock_send_mail.assert_called_once()
+        # Check that one message was handed to the backend
+        self.assertEqual(len(FailingEmailBackend.attempts), 1)
 
-    @patch('django.core.mail.send_mail')
-    def test_send_dataset_update_notification_email_exception_handling(self, mock_send_mail):
+    @stub_email_templates
+    @override_settings(EMAIL_BACKEND='datasets.tests.FailingEmailBackend')
+    def test_send_dataset_update_notification_email_exception_handling(self):
         """Test exception handling in dataset update notification email"""
-        # Make send_mail raise an exception
-        mock_send_mail.side_effect = Exception('SMTP Error')
-        
-        # Clear any existing emails
-        mail.outbox = []
+        FailingEmailBackend.attempts = []
         
         # Send notification (should not raise exception)
-        try:
+        with self.assertLogs('datasets.email', level='ERROR') as log_capture:
+            try:
+                send_dataset_update_notification_email(self.dataset)
+            except Exception as e:
+                self.fail(f"send_dataset_update_notification_email raised an exception: {e}")
+        
+        # Check that a send was attempted for each user
+        self.assertEqual(len(FailingEmailBackend.attempts), 2)  # owner and other_user
+        # Check that failures are logged with their traceback
+        self.assertEqual(len(log_capture.records), 2)
+        self.assertTrue(all(record.exc_info for record in log_capture.records))
+
+    @override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_HOST_USER='',
+        EMAIL_HOST_PASSWORD='',
+        EMAIL_USE_TLS=False,
+        EMAIL_USE_SSL=False,
+        DEFAULT_FROM_EMAIL='noreply@test.com'
+    )
+    @patch('django.core.mail.backends.smtp.smtplib.SMTP')
+    def test_send_new_version_notification_email_single_connection(self, mock_smtp):
+        """Test that all recipients are sent over one SMTP connection"""
+        send_new_version_notification_email(self.dataset, self.version)
+        
+        mock_smtp.assert_called_once()
+        smtp_connection = mock_smtp.return_value
+        self.assertEqual(smtp_connection.sendmail.call_count, 2)  # owner and other_user
+        recipients = sorted(call.args[1][0] for call in smtp_connection.sendmail.call_args_list)
+        self.assertEqual(recipients, ['other@test.com', 'owner@test.com'])
+
+    def test_notification_templates_rendered_once(self):
+        """Test that notification templates are rendered once regardless of recipient count"""
+        User.objects.create_user(
+            username='third_user',
+            email='third@test.com',
+            password='testpass123',
+            notify_dataset_updates=True
+        )
+        
+        with patch('django.template.loader.render_to_string', return_value='body') as mock_render:
             send_dataset_update_notification_email(self.dataset)
-        except Exception as e:
-            self.fail(f"send_dataset_update_notification_email raised an exception: {e}")
         
-        # Check that send_mail was called for each user
-        self.assertEqual(mock_send_mail.call_count, 2)  # owner and other_user
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mock_render.call_count, 2)  # HTML and plain text
+
+
+class NotificationTemplateTests(SimpleTestCase):
+    """Test cases for notification email templates that need no database"""
 
     def test_notification_email_templates_exist(self):
         """Test that all required email templates exist"""
         from django.template.loader import get_template
         
-        # Test comment notification templates
-        comment_html_template = get_template('datasets/email/comment_notification.html')
-        comment_txt_template = get_template('datasets/email/comment_notification.txt')
-        self.assertIsNotNone(comment_html_template)
-        self.assertIsNotNone(comment_txt_template)
-        
-        # Test dataset update notification templates
-        update_html_template = get_template('datasets/email/dataset_update_notification.html')
-        update_txt_template = get_template('datasets/email/dataset_update_notification.txt')
-        self.assertIsNotNone(update_html_template)
-        self.assertIsNotNone(update_txt_template)
-        
-        # Test new version notification templates
-        version_html_template = get_template('datasets/email/new_version_notification.html')
-        version_txt_template = get_template('datasets/email/new_version_notification.txt')
-        self.assertIsNotNone(version_html_template)
-        self.assertIsNotNone(version_txt_template)
+        for name in ('comment_notification', 'dataset_update_notification', 'new_version_notification'):
+            for extension in ('html', 'txt'):
+                path = f'datasets/email/{name}.{extension}'
+                with self.subTest(template=path):
+                    self.assertIsNotNone(get_template(path))
 
 
-class DatasetVersionFormTests(TestCase):
-    """Tests for the dataset version form multi-file capabilities."""
+class DatasetFormTests(TestCase):
+    """Tests for the dataset form"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='formowner',
+            email='formowner@example.com',
+            password='testpass123'
+        )
+        self.dataset = Dataset.objects.create(
+            title='Edited Dataset',
+            description='Dataset being edited',
+            owner=self.user
+        )
+        self.related = Dataset.objects.create(
+            title='Related Dataset',
+            description='Dataset offered as related',
+            owner=self.user
+        )
+
+    def test_tags_parsed_from_comma_separated_input(self):
+        """Comma-separated tags are trimmed into a list and empty entries dropped"""
+        form = DatasetForm(
+            data={
+                'title': 'Tagged Dataset',
+                'description': 'Dataset with tags',
+                'status': 'draft',
+                'access_level': 'public',
+                'tags': ' climate , vienna,, ',
+            },
+            user=self.user,
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['tags'], ['climate', 'vienna'])
+
+    def test_too_many_tags_rejected(self):
+        """More than ten tags are rejected"""
+        form = DatasetForm(
+            data={
+                'title': 'Tagged Dataset',
+                'description': 'Dataset with tags',
+                'status': 'draft',
+                'access_level': 'public',
+                'tags': ','.join(f'tag{i}' for i in range(11)),
+            },
+            user=self.user,
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('Maximum 10 tags allowed.', form.errors['tags'])
+
+    def test_long_tags_rejected(self):
+        """Tags longer than 50 characters are rejected"""
+        form = DatasetForm(
+            data={
+                'title': 'Tagged Dataset',
+                'description': 'Dataset with tags',
+                'status': 'draft',
+                'access_level': 'public',
+                'tags': 'climate,' + 'x' * 51,
+            },
+            user=self.user,
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('Tags can be at most 50 characters long.', form.errors['tags'])
+
+    def test_related_datasets_choices_use_titles(self):
+        """Related dataset choices are (pk, title) pairs excluding the edited dataset"""
+        form = DatasetForm(instance=self.dataset, user=self.user)
+        choices = list(form.fields['related_datasets'].choices)
+        self.assertEqual(choices, [(self.related.pk, 'Related Dataset')])
+
+    def test_related_datasets_selected_and_valid(self):
+        """Selected related datasets render as selected and validate"""
+        self.dataset.related_datasets.add(self.related)
+        form = DatasetForm(instance=self.dataset, user=self.user)
+        rendered = str(form['related_datasets'])
+        self.assertIn(f'value="{self.related.pk}" selected', rendered)
+
+        form = DatasetForm(
+            data={
+                'title': 'Edited Dataset',
+                'description': 'Dataset being edited',
+                'status': 'draft',
+                'access_level': 'public',
+                'related_datasets': [str(self.related.pk)],
+            },
+            instance=self.dataset,
+            user=self.user,
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(list(form.cleaned_data['related_datasets']), [self.related])
+
+
+class DatasetProjectAssignmentFormTests(TestCase):
+    """Tests for the dataset project assignment form"""
 
     def setUp(self):
         self.user = User.objects.create_user(
+            username='projectowner',
+            email='projectowner@example.com',
+            password='testpass123'
+        )
+        self.dataset = Dataset.objects.create(
+            title='Assigned Dataset',
+            description='Dataset assigned to projects',
+            owner=self.user
+        )
+        self.assigned = Project.objects.create(title='Assigned Project', description='Assigned', owner=self.user)
+        self.other = Project.objects.create(title='Other Project', description='Other', owner=self.user)
+        self.dataset.projects.add(self.assigned)
+
+    def test_current_projects_preselected(self):
+        """Current projects are given as initial primary keys and render checked"""
+        form = DatasetProjectAssignmentForm(user=self.user, dataset=self.dataset)
+        self.assertEqual(form.fields['projects'].initial, [self.assigned.pk])
+
+        rendered = str(form['projects'])
+        self.assertIn(f'value="{self.assigned.pk}"', rendered)
+        self.assertEqual(rendered.count('checked'), 1)
+
+
+class DatasetVersionFormTests(TestCase):
+    """Tests for the dataset version form multi-file capabilities."""
+
+    # All supported file formats with the content type a browser would send
+    SUPPORTED_FORMATS = (
+        ('data.csv', 'text/csv'),
+        ('data.json', 'application/json'),
+        ('data.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+        ('data.xls', 'application/vnd.ms-excel'),
+        ('data.txt', 'text/plain'),
+        ('data.zip', 'application/zip'),
+        ('data.tar.gz', 'application/gzip'),
+        ('data.gpkg', 'application/geopackage+sqlite3'),
+        ('data.sav', 'application/x-spss-sav'),
+        ('data.zsav', 'application/x-spss-sav'),
+        ('data.por', 'application/x-spss-por'),
+        ('data.dta', 'application/x-stata'),
+        ('data.rds', 'application/octet-stream'),
+        ('data.shp', 'application/octet-stream'),
+        ('data.geojson', 'application/geo+json'),
+        ('data.kml', 'application/vnd.google-earth.kml+xml'),
+        ('data.kmz', 'application/vnd.google-earth.kmz'),
+        ('data.tif', 'image/tiff'),
+        ('data.png', 'image/png'),
+        ('data.sqlite', 'application/x-sqlite3'),
+        ('data.sql', 'application/sql'),
+        ('data.pdf', 'application/pdf'),
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username='formuser',
             email='formuser@example.com',
             password='testpass123'
         )
-        self.dataset = Dataset.objects.create(
+        cls.dataset = Dataset.objects.create(
             title='Form Dataset',
             description='Dataset for form tests',
-            owner=self.user
+            owner=cls.user
         )
 
     def test_form_accepts_multiple_file_uploads(self):
@@ -333,35 +551,35 @@ class DatasetVersionFormTests(TestCase):
         self.assertFalse(form.is_valid())
         self.assertIn('Please do not upload files when using the external URL method.', form.non_field_errors())
 
+    @patch('datasets.forms.MAX_VERSION_FILE_SIZE', 10)
+    def test_form_lists_all_oversized_files(self):
+        """Ensure every file over the size limit is reported in a single error."""
+        small_file = SimpleUploadedFile('small.csv', b'a,b\n')
+        big_one = SimpleUploadedFile('big1.csv', b'col1,col2\n1,2\n')
+        big_two = SimpleUploadedFile('big2.csv', b'col1,col2\n3,4\n')
+
+        form = DatasetVersionForm(
+            data={
+                'version_number': '1.0',
+                'description': 'Too large',
+                'input_method': 'upload',
+                'file_url': '',
+                'file_url_description': '',
+                'file_size_text': '',
+            },
+            files=MultiValueDict({'files': [small_file, big_one, big_two]}),
+            dataset=self.dataset,
+        )
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.errors['files']), 1)
+        self.assertIn('"big1.csv"', form.errors['files'][0])
+        self.assertIn('"big2.csv"', form.errors['files'][0])
+        self.assertNotIn('small.csv', form.errors['files'][0])
+
     def test_form_accepts_supported_file_formats(self):
         """Test that the form accepts all supported file formats including .dta and .rds"""
-        # All supported file formats
-        supported_formats = [
-            ('data.csv', 'text/csv'),
-            ('data.json', 'application/json'),
-            ('data.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
-            ('data.xls', 'application/vnd.ms-excel'),
-            ('data.txt', 'text/plain'),
-            ('data.zip', 'application/zip'),
-            ('data.tar.gz', 'application/gzip'),
-            ('data.gpkg', 'application/geopackage+sqlite3'),
-            ('data.sav', 'application/x-spss-sav'),
-            ('data.zsav', 'application/x-spss-sav'),
-            ('data.por', 'application/x-spss-por'),
-            ('data.dta', 'application/x-stata'),
-            ('data.rds', 'application/octet-stream'),
-            ('data.shp', 'application/octet-stream'),
-            ('data.geojson', 'application/geo+json'),
-            ('data.kml', 'application/vnd.google-earth.kml+xml'),
-            ('data.kmz', 'application/vnd.google-earth.kmz'),
-            ('data.tif', 'image/tiff'),
-            ('data.png', 'image/png'),
-            ('data.sqlite', 'application/x-sqlite3'),
-            ('data.sql', 'application/sql'),
-            ('data.pdf', 'application/pdf'),
-        ]
-        
-        for filename, content_type in supported_formats:
+        for filename, content_type in self.SUPPORTED_FORMATS:
             with self.subTest(filename=filename):
                 test_file = SimpleUploadedFile(
                     filename,
@@ -389,13 +607,10 @@ class DatasetVersionFormTests(TestCase):
                 )
                 
                 # Verify the file was processed
-                if form.is_valid():
-                    self.assertIn('uploaded_files', form.cleaned_data)
-                    self.assertEqual(len(form.cleaned_data['uploaded_files']), 1)
-                    self.assertEqual(
-                        form.cleaned_data['uploaded_files'][0].name,
-                        filename
-                    )
+                self.assertEqual(
+                    [upload.name for upload in form.cleaned_data['uploaded_files']],
+                    [filename]
+                )
 
     def test_form_widget_accept_attribute_includes_all_formats(self):
         """Test that the file input widget's accept attribute includes all supported formats"""
@@ -413,13 +628,12 @@ class DatasetVersionFormTests(TestCase):
             '.tif', '.png', '.sqlite', '.sql', '.pdf'  # Other formats
         ]
         
-        for format_ext in required_formats:
-            with self.subTest(format=format_ext):
-                self.assertIn(
-                    format_ext,
-                    accept_attr,
-                    f"Accept attribute should include {format_ext}. Current value: {accept_attr}"
-                )
+        accepted_formats = {extension.strip() for extension in accept_attr.split(',')}
+        missing_formats = set(required_formats) - accepted_formats
+        self.assertFalse(
+            missing_formats,
+            f"Accept attribute is missing {sorted(missing_formats)}. Current value: {accept_attr}"
+        )
 
     def test_form_accepts_new_statistical_formats(self):
         """Specifically test that the newly added .dta and .rds formats are accepted"""
@@ -480,28 +694,51 @@ class DatasetVersionFormTests(TestCase):
         self.assertIn('.rds', accept_attr, '.rds should be in accept attribute')
 
 
-class DatasetModelTests(TestCase):
+class DatasetModelTests(TemporaryMediaMixin, TestCase):
     """Test cases for Dataset model"""
     
-    def setUp(self):
-        """Set up test data"""
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data once for the whole class"""
+        cls.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testpass123'
         )
         
-        self.publisher = Publisher.objects.create(
+        cls.publisher = Publisher.objects.create(
             name='Test Publisher',
             description='Test publisher description'
         )
         
-        self.category = DatasetCategory.objects.create(
+        cls.category = DatasetCategory.objects.create(
             name='Test Category',
             description='Test category description',
             color='#007bff'
         )
-    
+
+    def test_with_related_query_count_is_constant(self):
+        """Test with_related loads list relations without per-row queries"""
+        for index in range(3):
+            dataset = Dataset.objects.create(
+                title=f'Dataset {index}',
+                description='Listed dataset',
+                owner=self.user,
+                category=self.category
+            )
+            dataset.contributors.add(self.user)
+            DatasetVersion.objects.create(dataset=dataset, version_number='1.0', created_by=self.user)
+
+        # datasets, contributors, versions, version files
+        with self.assertNumQueries(4):
+            for dataset in Dataset.objects.with_related():
+                dataset.owner.username
+                dataset.category.name
+                list(dataset.contributors.all())
+                for version in dataset.versions.all():
+                    version.created_by.username
+                    list(version.files.all())
+
     def test_dataset_creation(self):
         """Test creating a basic dataset"""
         dataset = Dataset.objects.create(
@@ -541,26 +778,30 @@ class DatasetModelTests(TestCase):
         statuses = ['draft', 'published', 'archived', 'private']
         
         for status in statuses:
-            dataset = Dataset.objects.create(
-                title=f'Test {status} dataset',
-                description='Test description',
-                owner=self.user,
-                status=status
-            )
-            self.assertEqual(dataset.status, status)
+            with self.subTest(status=status):
+                dataset = Dataset(
+                    title=f'Test {status} dataset',
+                    description='Test description',
+                    owner=self.user,
+                    status=status
+                )
+                dataset.full_clean()
+                self.assertEqual(dataset.status, status)
     
     def test_dataset_access_level_choices(self):
         """Test all access level choices are available"""
         access_levels = ['public', 'restricted', 'private']
         
         for access_level in access_levels:
-            dataset = Dataset.objects.create(
-                title=f'Test {access_level} dataset',
-                description='Test description',
-                owner=self.user,
-                access_level=access_level
-            )
-            self.assertEqual(dataset.access_level, access_level)
+            with self.subTest(access_level=access_level):
+                dataset = Dataset(
+                    title=f'Test {access_level} dataset',
+                    description='Test description',
+                    owner=self.user,
+                    access_level=access_level
+                )
+                dataset.full_clean()
+                self.assertEqual(dataset.access_level, access_level)
     
     def test_dataset_published_at_auto_set(self):
         """Test that published_at is set when status changes to published"""
@@ -573,16 +814,92 @@ class DatasetModelTests(TestCase):
         
         self.assertIsNone(dataset.published_at)
         
-        # Change status to published
+        # Change status to published at a fixed point in time
+        published_time = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
         dataset.status = 'published'
-        dataset.save()
+        with patch('django.utils.timezone.now', return_value=published_time):
+            dataset.save()
+        
+        self.assertEqual(dataset.published_at, published_time)
+    
+    def test_dataset_published_at_saved_with_update_fields(self):
+        """Test that a status-only save also writes published_at"""
+        dataset = Dataset.objects.create(
+            title='Test Dataset',
+            description='Test description',
+            owner=self.user,
+            status='draft'
+        )
+        
+        dataset.status = 'published'
+        dataset.save(update_fields=['status'])
         
+        dataset.refresh_from_db()
+        self.assertEqual(dataset.status, 'published')
         self.assertIsNotNone(dataset.published_at)
-        self.assertAlmostEqual(
-            dataset.published_at.timestamp(),
-            timezone.now().timestamp(),
-            delta=1
+    
+    def test_dataset_choice_constraints(self):
+        """Test that the database rejects unknown status and access level values"""
+        dataset = Dataset.objects.create(
+            title='Test Dataset',
+            description='Test description',
+            owner=self.user
+        )
+        
+        for field in ('status', 'access_level'):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                Dataset.objects.filter(pk=dataset.pk).update(**{field: 'unknown'})
+    
+    def test_dataset_for_list_defers_long_text(self):
+        """Test that list querysets skip description and citation"""
+        Dataset.objects.create(
+            title='Test Dataset',
+            description='Long description',
+            citation='Citation text',
+            owner=self.user
+        )
+        
+        dataset = Dataset.objects.for_list().get()
+        self.assertEqual(dataset.get_deferred_fields(), {'description', 'citation'})
+        self.assertEqual(dataset.title, 'Test Dataset')
+    
+    def test_dataset_increment_counters(self):
+        """Test that view and download counters are incremented in the database"""
+        dataset = Dataset.objects.create(
+            title='Test Dataset',
+            description='Test description',
+            owner=self.user
+        )
+        
+        Dataset.increment_views(dataset.pk)
+        Dataset.increment_views(dataset.pk)
+        Dataset.increment_downloads(dataset.pk)
+        
+        dataset.refresh_from_db()
+        self.assertEqual(dataset.view_count, 2)
+        self.assertEqual(dataset.download_count, 1)
+    
+    def test_dataset_audit_log_skips_excluded_fields(self):
+        """Test that changes to large text fields and counters are not audit logged"""
+        from auditlog.models import LogEntry
+        dataset = Dataset.objects.create(
+            title='Test Dataset',
+            description='Test description',
+            owner=self.user
         )
+        entries = LogEntry.objects.get_for_object(dataset)
+        initial_count = entries.count()
+        self.assertNotIn('description', entries.first().changes_dict)
+        
+        dataset.description = 'Updated description'
+        dataset.view_count = 5
+        dataset.save()
+        self.assertEqual(entries.count(), initial_count)
+        
+        dataset.title = 'Renamed Dataset'
+        dataset.save()
+        self.assertEqual(entries.count(), initial_count + 1)
+        self.assertEqual(list(entries.first().changes_dict), ['title'])
     
     def test_dataset_get_tags_list(self):
         """Test the get_tags_list method"""
@@ -590,23 +907,84 @@ class DatasetModelTests(TestCase):
             title='Test Dataset',
             description='Test description',
             owner=self.user,
-            tags='tag1, tag2, tag3'
+            tags=['tag1', 'tag2', 'tag3']
         )
         
+        dataset.refresh_from_db()
         tags = dataset.get_tags_list()
         self.assertEqual(tags, ['tag1', 'tag2', 'tag3'])
         
         # Test with empty tags
-        dataset.tags = ''
-        dataset.save()
+        dataset.tags = []
         tags = dataset.get_tags_list()
         self.assertEqual(tags, [])
         
-        # Test with whitespace
-        dataset.tags = ' tag1 , tag2 , tag3 '
-        dataset.save()
-        tags = dataset.get_tags_list()
-        self.assertEqual(tags, ['tag1', 'tag2', 'tag3'])
+        # Test default for new datasets
+        dataset = Dataset(
+            title='Untagged Dataset',
+            description='Test description',
+            owner=self.user
+        )
+        self.assertEqual(dataset.get_tags_list(), [])
+
+    def test_dataset_filter_by_tags(self):
+        """Test datasets can be filtered by tag containment"""
+        climate = Dataset.objects.create(
+            title='Climate Dataset',
+            description='Test description',
+            owner=self.user,
+            tags=['climate', 'vienna']
+        )
+        Dataset.objects.create(
+            title='Transport Dataset',
+            description='Test description',
+            owner=self.user,
+            tags=['transport', 'vienna']
+        )
+        
+        self.assertEqual(list(Dataset.objects.filter(tags__contains=['climate'])), [climate])
+        self.assertEqual(Dataset.objects.filter(tags__contains=['vienna']).count(), 2)
+    
+    def test_dataset_search_matches_single_tags(self):
+        """Test that search compares each tag rather than the array's text form"""
+        climate = Dataset.objects.create(
+            title='Climate Dataset',
+            description='Test description',
+            owner=self.user,
+            tags=['climate', 'vienna_100%']
+        )
+        
+        self.assertEqual(list(Dataset.objects.search('VIENNA')), [climate])
+        self.assertEqual(list(Dataset.objects.search('_100%')), [climate])
+        for text in (',', '{', '"', 'climate,vienna', 'a%1'):
+            with self.subTest(text=text):
+                self.assertFalse(Dataset.objects.search(text).exists())
+    
+    def test_visible_to_matches_is_accessible_by(self):
+        """Test the visible_to annotation agrees with is_accessible_by"""
+        from django.contrib.auth.models import AnonymousUser
+        other_user = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpass123'
+        )
+        superuser = User.objects.create_superuser(
+            username='superuser',
+            email='super@example.com',
+            password='testpass123'
+        )
+        for access_level in ('public', 'restricted', 'private'):
+            Dataset.objects.create(
+                title=f'{access_level} dataset',
+                description='Test description',
+                owner=self.user,
+                access_level=access_level
+            )
+
+        for user in (AnonymousUser(), other_user, self.user, superuser):
+            for dataset in Dataset.objects.visible_to(user):
+                with self.subTest(user=str(user), access_level=dataset.access_level):
+                    self.assertEqual(dataset.accessible, bool(dataset.is_accessible_by(user)))
     
     def test_dataset_is_accessible_by_public(self):
         """Test dataset accessibility for public datasets"""
@@ -685,30 +1063,21 @@ class DatasetModelTests(TestCase):
             owner=self.user
         )
         
-        # Create versions with different file types
-        version1 = DatasetVersion.objects.create(
-            dataset=dataset,
-            version_number='1.0',
-            description='Version 1',
-            created_by=self.user,
-            file_url='http://example.com/data.csv'
-        )
-        
-        version2 = DatasetVersion.objects.create(
-            dataset=dataset,
-            version_number='2.0',
-            description='Version 2',
-            created_by=self.user,
-            file_url='http://example.com/data.json'
-        )
-        
-        version3 = DatasetVersion.objects.create(
-            dataset=dataset,
-            version_number='3.0',
-            description='Version 3',
-            created_by=self.user,
-            file_url='http://example.com/data.xlsx'
-        )
+        # Create versions with different file types in one INSERT; bulk_create
+        # skips save(), so the stored formats are computed inline
+        versions = [
+            DatasetVersion(
+                dataset=dataset,
+                version_number=f'{number}.0',
+                description=f'Version {number}',
+                created_by=self.user,
+                file_url=f'http://example.com/data.{extension}'
+            )
+            for number, extension in ((1, 'csv'), (2, 'json'), (3, 'xlsx'))
+        ]
+        for version in versions:
+            version.formats = version.compute_formats()
+        DatasetVersion.objects.bulk_create(versions)
         
         formats = dataset.get_available_formats()
         self.assertIn('CSV', formats)
@@ -748,6 +1117,32 @@ class DatasetModelTests(TestCase):
         self.assertIn('CSV', formats)
         self.assertIn('GEOJSON', formats)
     
+    def test_dataset_get_available_formats_with_formats_annotation(self):
+        """Test that with_formats aggregates version formats in the dataset query"""
+        dataset = Dataset.objects.create(
+            title='Prefetched Dataset',
+            description='Test description',
+            owner=self.user
+        )
+        for number, url in (('1.0', 'http://example.com/data.tar.gz'), ('2.0', 'http://example.com/DATA.SAV')):
+            DatasetVersion.objects.create(
+                dataset=dataset,
+                version_number=number,
+                created_by=self.user,
+                file_url=url
+            )
+        
+        with self.assertNumQueries(1):
+            dataset = Dataset.objects.with_formats().get(pk=dataset.pk)
+            self.assertEqual(dataset.get_available_formats(), ['SAV', 'TAR.GZ'])
+            self.assertEqual(dataset.version_count, 2)
+        
+        # Datasets without versions get an empty list and no versions
+        empty = Dataset.objects.create(title='Empty Dataset', description='Test description', owner=self.user)
+        empty = Dataset.objects.with_formats().get(pk=empty.pk)
+        self.assertEqual(empty.get_available_formats(), [])
+        self.assertEqual(empty.version_count, 0)
+    
     def test_dataset_ordering(self):
         """Test that datasets are ordered by creation date (newest first)"""
         dataset1 = Dataset.objects.create(
@@ -767,21 +1162,22 @@ class DatasetModelTests(TestCase):
         self.assertEqual(datasets[1], dataset1)  # Older second
 
 
-class DatasetVersionModelTests(TestCase):
+class DatasetVersionModelTests(TemporaryMediaMixin, TestCase):
     """Test cases for DatasetVersion model"""
     
-    def setUp(self):
-        """Set up test data"""
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data once for the whole class"""
+        cls.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testpass123'
         )
         
-        self.dataset = Dataset.objects.create(
+        cls.dataset = Dataset.objects.create(
             title='Test Dataset',
             description='Test description',
-            owner=self.user
+            owner=cls.user
         )
     
     def test_dataset_version_creation(self):
@@ -801,6 +1197,22 @@ class DatasetVersionModelTests(TestCase):
         self.assertEqual(version.file_size, 0)
         self.assertIsNotNone(version.created_at)
     
+    def test_with_relations_joins_dataset_and_creator(self):
+        """Test with_relations loads the dataset and creator in one query"""
+        for number in ('1.0', '1.1'):
+            DatasetVersion.objects.create(
+                dataset=self.dataset,
+                version_number=number,
+                created_by=self.user
+            )
+
+        with self.assertNumQueries(1):
+            labels = [
+                (version.dataset.title, version.created_by.username)
+                for version in DatasetVersion.objects.with_relations()
+            ]
+        self.assertEqual(labels, [('Test Dataset', 'testuser')] * 2)
+    
     def test_dataset_version_str_representation(self):
         """Test the string representation of dataset version"""
         version = DatasetVersion.objects.create(
@@ -846,25 +1258,21 @@ class DatasetVersionModelTests(TestCase):
             file_size=1024
         )
         
+        # The display reads the in-memory size fields, so only attachments are persisted
         # Test with file_size_text
         version.file_size_text = '1.5 MB'
-        version.save()
         self.assertEqual(version.get_file_size_display(), '1.5 MB')
         
         # Test with file_size only
         version.file_size_text = ''
         version.file_size = 2048
-        version.save()
         self.assertEqual(version.get_file_size_display(), '2.0 KB')
         
         # Test with no size information
         version.file_size = 0
-        version.save()
         self.assertEqual(version.get_file_size_display(), 'Unknown size')
         
         # Test with uploaded attachments
-        version.file = None
-        version.save()
         attachment_one = DatasetVersionFile.objects.create(
             version=version,
             file=SimpleUploadedFile('attachment1.csv', b'data1'),
@@ -872,7 +1280,6 @@ class DatasetVersionModelTests(TestCase):
             original_name='attachment1.csv'
         )
         version.file_size = attachment_one.file_size
-        version.save(update_fields=['file_size'])
         self.assertEqual(version.get_file_size_display(), '1 file, 5.0 B')
 
         attachment_two = DatasetVersionFile.objects.create(
@@ -882,8 +1289,64 @@ class DatasetVersionModelTests(TestCase):
             original_name='attachment2.csv'
         )
         version.file_size = attachment_one.file_size + attachment_two.file_size
-        version.save(update_fields=['file_size'])
         self.assertEqual(version.get_file_size_display(), '2 files, 12.0 B')
+
+    def test_dataset_version_attachment_totals_queries(self):
+        """Test attachment totals use one aggregate query or the prefetch cache"""
+        version = DatasetVersion.objects.create(
+            dataset=self.dataset,
+            version_number='1.0',
+            description='Initial version',
+            created_by=self.user
+        )
+        for name, content in [('a.csv', b'abc'), ('b.csv', b'defgh')]:
+            DatasetVersionFile.objects.create(
+                version=version,
+                file=SimpleUploadedFile(name, content),
+                file_size=len(content),
+                original_name=name
+            )
+        
+        version = DatasetVersion.objects.get(pk=version.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(version.get_attachment_totals(), (2, 8))
+        
+        version = DatasetVersion.objects.prefetch_related('files').get(pk=version.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(version.get_file_size_display(), '2 files, 8.0 B')
+
+    def test_dataset_version_upload_path_uses_creation_date(self):
+        """Test that upload paths use the version creation date once it exists"""
+        version = DatasetVersion(dataset=self.dataset, version_number='1.0', created_by=self.user)
+        today = timezone.now().strftime('%Y/%m/%d')
+        self.assertEqual(
+            dataset_version_upload_path(version, 'data.csv'),
+            f'datasets/versions/{today}/dataset_{self.dataset.pk}_version_1.0_data.csv'
+        )
+        
+        version.created_at = timezone.now() - timedelta(days=400)
+        created = version.created_at.strftime('%Y/%m/%d')
+        self.assertEqual(
+            dataset_version_upload_path(version, 'data.csv'),
+            f'datasets/versions/{created}/dataset_{self.dataset.pk}_version_1.0_data.csv'
+        )
+
+    def test_format_file_size_unit_boundaries(self):
+        """Test format_file_size switches units at powers of 1024"""
+        cases = [
+            (0, '0 B'),
+            (1, '1.0 B'),
+            (1023, '1023.0 B'),
+            (1024, '1.0 KB'),
+            (1024 ** 2 - 1, '1024.0 KB'),
+            (1024 ** 2, '1.0 MB'),
+            (3 * 1024 ** 3, '3.0 GB'),
+            (1024 ** 4, '1.0 TB'),
+            (2048 * 1024 ** 4, '2048.0 TB'),
+        ]
+        for num_bytes, expected in cases:
+            with self.subTest(num_bytes=num_bytes):
+                self.assertEqual(format_file_size(num_bytes), expected)
     
     def test_dataset_version_has_file(self):
         """Test the has_file method"""
@@ -897,26 +1360,23 @@ class DatasetVersionModelTests(TestCase):
         # No file initially
         self.assertFalse(version.has_file())
         
+        # The file and URL checks read in-memory fields, so only attachments are persisted
         # With file URL
         version.file_url = 'http://example.com/data.csv'
-        version.save()
         self.assertTrue(version.has_file())
         
         # With file URL description
         version.file_url = ''
         version.file_url_description = 'Data available at external location'
-        version.save()
         self.assertTrue(version.has_file())
         
         # With uploaded file (mocked)
         version.file_url_description = ''
         version.file = SimpleUploadedFile('test.csv', b'content')
-        version.save()
         self.assertTrue(version.has_file())
         
         # With uploaded attachments
         version.file = None
-        version.save()
         DatasetVersionFile.objects.create(
             version=version,
             file=SimpleUploadedFile('attachment.csv', b'data'),
@@ -924,6 +1384,130 @@ class DatasetVersionModelTests(TestCase):
             original_name='attachment.csv'
         )
         self.assertTrue(version.has_file())
+    
+    def test_dataset_version_has_file_without_queries(self):
+        """Test has_file does not query attachments when a file or URL is set"""
+        version = DatasetVersion.objects.create(
+            dataset=self.dataset,
+            version_number='1.0',
+            created_by=self.user,
+            file_url='http://example.com/data.csv'
+        )
+        version = DatasetVersion.objects.get(pk=version.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(version.has_file())
+        
+        # Deferred file fields are still honoured
+        version = DatasetVersion.objects.defer('file').get(pk=version.pk)
+        self.assertTrue(version.has_file())
+    
+    def test_dataset_version_has_file_with_prefetched_files(self):
+        """Test has_file reads prefetched attachments without extra queries"""
+        with_attachment = DatasetVersion.objects.create(
+            dataset=self.dataset,
+            version_number='1.0',
+            created_by=self.user
+        )
+        DatasetVersionFile.objects.create(
+            version=with_attachment,
+            file=SimpleUploadedFile('data.csv', b'content'),
+            file_size=7,
+            original_name='data.csv'
+        )
+        DatasetVersion.objects.create(
+            dataset=self.dataset,
+            version_number='2.0',
+            created_by=self.user
+        )
+        
+        with self.assertNumQueries(2):
+            flags = {
+                version.version_number: version.has_file()
+                for version in DatasetVersion.objects.prefetch_related('files')
+            }
+        self.assertEqual(flags, {'1.0': True, '2.0': False})
+    
+    def test_dataset_version_formats_kept_in_sync(self):
+        """Test that stored formats follow the URL and attachment changes"""
+        version = DatasetVersion.objects.create(
+            dataset=self.dataset,
+            version_number='1.0',
+            created_by=self.user,
+            file_url='http://example.com/data.csv'
+        )
+        self.assertEqual(version.formats, ['CSV'])
+        
+        attachment = DatasetVersionFile.objects.create(
+            version=version,
+            file=SimpleUploadedFile('map.geojson', b'{}'),
+            file_size=2,
+            original_name='map.geojson'
+        )
+        version.refresh_from_db()
+        self.assertEqual(version.formats, ['CSV', 'GEOJSON'])
+        
+        attachment.delete()
+        version.refresh_from_db()
+        self.assertEqual(version.formats, ['CSV'])
+        
+        version.file_url = ''
+        version.save(update_fields=['file_url'])
+        version.refresh_from_db()
+        self.assertEqual(version.formats, [])
+    
+    def test_get_file_formats_from_urls(self):
+        """Test that URL formats are taken from the extension at the end of the path"""
+        cases = [
+            ('http://example.com/data.csv', {'CSV'}),
+            ('http://example.com/map.geojson', {'GEOJSON'}),
+            ('http://example.com/archive.tar.gz?download=1', {'TAR.GZ'}),
+            ('http://example.com/raster.TIFF#page', {'TIFF'}),
+            ('http://example.com/layer.shp.xml', {'SHP.XML'}),
+            ('http://example.com/data.csv/view', set()),
+            ('http://example.com/landing-page', set()),
+        ]
+        for url, expected in cases:
+            with self.subTest(url=url):
+                self.assertEqual(get_file_formats(file_url=url), expected)
+
+
+class ModelStrRepresentationTests(SimpleTestCase):
+    """Test string representations on unsaved instances that need no database"""
+
+    def setUp(self):
+        self.user = User(username='testuser')
+        self.dataset = Dataset(title='Test Dataset', owner=self.user)
+
+    def test_publisher_str_representation(self):
+        """Test the string representation of publisher"""
+        publisher = Publisher(name='Test Publisher', description='Test description')
+        
+        self.assertEqual(str(publisher), 'Test Publisher')
+
+    def test_dataset_category_str_representation(self):
+        """Test the string representation of dataset category"""
+        category = DatasetCategory(name='Test Category', description='Test description')
+        
+        self.assertEqual(str(category), 'Test Category')
+
+    def test_comment_str_representation(self):
+        """Test the string representation of comment"""
+        comment = Comment(dataset=self.dataset, author=self.user, content='Test comment')
+        
+        expected_str = f'Comment by {self.user.username} on {self.dataset.title}'
+        self.assertEqual(str(comment), expected_str)
+
+    def test_dataset_download_str_representation(self):
+        """Test the string representation of dataset download"""
+        download = DatasetDownload(dataset=self.dataset, user=self.user, ip_address='192.168.1.1')
+        
+        expected_str = f'{self.dataset.title} - {self.user.username}'
+        self.assertEqual(str(download), expected_str)
+        
+        # Test anonymous user
+        download.user = None
+        expected_str = f'{self.dataset.title} - Anonymous'
+        self.assertEqual(str(download), expected_str)
 
 
 class PublisherModelTests(TestCase):
@@ -946,15 +1530,6 @@ class PublisherModelTests(TestCase):
         self.assertIsNotNone(publisher.created_at)
         self.assertIsNotNone(publisher.updated_at)
     
-    def test_publisher_str_representation(self):
-        """Test the string representation of publisher"""
-        publisher = Publisher.objects.create(
-            name='Test Publisher',
-            description='Test description'
-        )
-        
-        self.assertEqual(str(publisher), 'Test Publisher')
-    
     def test_publisher_unique_name(self):
         """Test that publisher names are unique"""
         Publisher.objects.create(
@@ -990,6 +1565,115 @@ class PublisherModelTests(TestCase):
         # Only the last one should be default
         self.assertFalse(publisher1.is_default)
         self.assertTrue(publisher2.is_default)
+    
+    def test_publisher_resave_default(self):
+        """Test that re-saving the default publisher keeps it default"""
+        publisher = Publisher.objects.create(
+            name='Publisher 1',
+            description='First publisher',
+            is_default=True
+        )
+        
+        publisher.description = 'Updated description'
+        publisher.save()
+        
+        publisher.refresh_from_db()
+        self.assertTrue(publisher.is_default)
+        self.assertEqual(Publisher.objects.filter(is_default=True).count(), 1)
+    
+    def test_publisher_resave_default_skips_demotion(self):
+        """Test that re-saving a loaded default publisher does not demote other rows"""
+        Publisher.objects.create(name='Publisher 1', description='First publisher', is_default=True)
+        publisher = Publisher.objects.get(name='Publisher 1')
+        
+        publisher.description = 'Updated description'
+        with CaptureQueriesContext(connection) as queries:
+            publisher.save()
+        
+        demotions = [query['sql'] for query in queries if 'SET "is_default"' in query['sql']]
+        self.assertEqual(demotions, [])
+    
+    def test_publisher_single_default_enforced_by_database(self):
+        """Test that the database rejects a second default publisher"""
+        Publisher.objects.create(name='Publisher 1', description='First publisher', is_default=True)
+        publisher2 = Publisher.objects.create(name='Publisher 2', description='Second publisher')
+        
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Publisher.objects.filter(pk=publisher2.pk).update(is_default=True)
+    
+    def test_publisher_stale_default_save(self):
+        """Test that saving a stale default publisher demotes the newer default"""
+        Publisher.objects.create(name='Publisher 1', description='First publisher', is_default=True)
+        stale = Publisher.objects.get(name='Publisher 1')
+        Publisher.objects.create(name='Publisher 2', description='Second publisher', is_default=True)
+        
+        stale.description = 'Updated description'
+        stale.save()
+        
+        defaults = Publisher.objects.filter(is_default=True)
+        self.assertEqual(list(defaults.values_list('name', flat=True)), ['Publisher 1'])
+    
+    def test_publisher_form_creates_new_default(self):
+        """Test that the publisher form can create a new default publisher"""
+        Publisher.objects.create(name='Publisher 1', description='First publisher', is_default=True)
+        
+        form = PublisherForm(data={'name': 'Publisher 2', 'is_active': 'on', 'is_default': 'on'})
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        
+        defaults = Publisher.objects.filter(is_default=True)
+        self.assertEqual(list(defaults.values_list('name', flat=True)), ['Publisher 2'])
+    
+    def test_publisher_form_switches_default(self):
+        """Test that the publisher form can make an existing publisher the default"""
+        Publisher.objects.create(name='Publisher 1', description='First publisher', is_default=True)
+        publisher2 = Publisher.objects.create(name='Publisher 2', description='Second publisher')
+        
+        form = PublisherForm(
+            data={'name': 'Publisher 2', 'is_active': 'on', 'is_default': 'on'},
+            instance=publisher2
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        
+        defaults = Publisher.objects.filter(is_default=True)
+        self.assertEqual(list(defaults.values_list('name', flat=True)), ['Publisher 2'])
+    
+    def test_publisher_admin_list_editable_switches_default(self):
+        """Test that the admin changelist can move the default to another publisher"""
+        publisher1 = Publisher.objects.create(name='Publisher 1', is_default=True)
+        publisher2 = Publisher.objects.create(name='Publisher 2')
+        superuser = User.objects.create_superuser(
+            username='superuser',
+            email='super@example.com',
+            password='testpass123'
+        )
+        self.client.force_login(superuser)
+        
+        response = self.client.post(reverse('admin:datasets_publisher_changelist'), {
+            'form-TOTAL_FORMS': '2',
+            'form-INITIAL_FORMS': '2',
+            'form-0-id': str(publisher1.pk),
+            'form-0-is_active': 'on',
+            'form-1-id': str(publisher2.pk),
+            'form-1-is_active': 'on',
+            'form-1-is_default': 'on',
+            '_save': 'Save',
+        })
+        
+        self.assertEqual(response.status_code, 302)
+        defaults = Publisher.objects.filter(is_default=True)
+        self.assertEqual(list(defaults.values_list('name', flat=True)), ['Publisher 2'])
+    
+    def test_publisher_unchanged_save_not_audited(self):
+        """Test that saving a publisher without changes writes no audit entry"""
+        from auditlog.models import LogEntry
+        
+        publisher = Publisher.objects.create(name='Publisher 1')
+        publisher.save()
+        
+        entries = LogEntry.objects.get_for_object(publisher)
+        self.assertEqual(list(entries.values_list('action', flat=True)), [LogEntry.Action.CREATE])
 
 
 class DatasetCategoryModelTests(TestCase):
@@ -1011,15 +1695,6 @@ class DatasetCategoryModelTests(TestCase):
         self.assertIsNotNone(category.created_at)
         self.assertIsNotNone(category.updated_at)
     
-    def test_dataset_category_str_representation(self):
-        """Test the string representation of dataset category"""
-        category = DatasetCategory.objects.create(
-            name='Test Category',
-            description='Test description'
-        )
-        
-        self.assertEqual(str(category), 'Test Category')
-    
     def test_dataset_category_unique_name(self):
         """Test that category names are unique"""
         DatasetCategory.objects.create(
@@ -1038,24 +1713,25 @@ class DatasetCategoryModelTests(TestCase):
 class CommentModelTests(TestCase):
     """Test cases for Comment model"""
     
-    def setUp(self):
-        """Set up test data"""
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data once for the whole class"""
+        cls.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testpass123'
         )
         
-        self.other_user = User.objects.create_user(
+        cls.other_user = User.objects.create_user(
             username='otheruser',
             email='other@example.com',
             password='testpass123'
         )
         
-        self.dataset = Dataset.objects.create(
+        cls.dataset = Dataset.objects.create(
             title='Test Dataset',
             description='Test description',
-            owner=self.user
+            owner=cls.user
         )
     
     def test_comment_creation(self):
@@ -1073,17 +1749,6 @@ class CommentModelTests(TestCase):
         self.assertIsNotNone(comment.created_at)
         self.assertIsNotNone(comment.updated_at)
     
-    def test_comment_str_representation(self):
-        """Test the string representation of comment"""
-        comment = Comment.objects.create(
-            dataset=self.dataset,
-            author=self.user,
-            content='Test comment'
-        )
-        
-        expected_str = f'Comment by {self.user.username} on {self.dataset.title}'
-        self.assertEqual(str(comment), expected_str)
-    
     def test_comment_can_edit_author(self):
         """Test that comment author can edit their comment"""
         comment = Comment.objects.create(
@@ -1138,6 +1803,26 @@ class CommentModelTests(TestCase):
         self.assertTrue(comment.can_edit(superuser))
 
 
+class CommentFormTests(TestCase):
+    """Test cases for comment content validation"""
+
+    def test_content_is_stripped(self):
+        """Surrounding whitespace is removed from valid comments"""
+        for form_class in (CommentForm, CommentEditForm):
+            with self.subTest(form=form_class.__name__):
+                form = form_class(data={'content': '   A long enough comment   '})
+                self.assertTrue(form.is_valid(), form.errors)
+                self.assertEqual(form.cleaned_data['content'], 'A long enough comment')
+
+    def test_short_content_rejected(self):
+        """Comments shorter than 10 characters after stripping are rejected"""
+        for form_class in (CommentForm, CommentEditForm):
+            with self.subTest(form=form_class.__name__):
+                form = form_class(data={'content': '   short      '})
+                self.assertFalse(form.is_valid())
+                self.assertIn('content', form.errors)
+
+
 class DatasetDownloadModelTests(TestCase):
     """Test cases for DatasetDownload model"""
     
@@ -1183,84 +1868,216 @@ class DatasetDownloadModelTests(TestCase):
         self.assertIsNone(download.user)
         self.assertEqual(download.ip_address, '192.168.1.1')
     
-    def test_dataset_download_str_representation(self):
-        """Test the string representation of dataset download"""
-        download = DatasetDownload.objects.create(
+    def test_dataset_download_not_audited(self):
+        """Test that download records do not write audit log entries"""
+        from auditlog.models import LogEntry
+        
+        DatasetDownload.objects.create(
             dataset=self.dataset,
             user=self.user,
-            ip_address='192.168.1.1',
-            user_agent='Mozilla/5.0'
+            ip_address='192.168.1.1'
         )
         
-        expected_str = f'{self.dataset.title} - {self.user.username}'
-        self.assertEqual(str(download), expected_str)
+        self.assertFalse(LogEntry.objects.get_for_model(DatasetDownload).exists())
+
+
+class DatasetListViewTests(TestCase):
+    """Test cases for the dataset list view"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # A recorded first login keeps the login-tracking write out of the query counts
+        cls.user = User.objects.create_user(
+            username='listuser',
+            email='listuser@example.com',
+            password='testpass123',
+            first_login_date=timezone.now()
+        )
+        cls.url = reverse('datasets:dataset_list')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create_featured_datasets(self, count):
+        for index in range(count):
+            dataset = Dataset.objects.create(
+                title=f'Featured Dataset {index}',
+                description='Test description',
+                owner=self.user,
+                is_featured=True
+            )
+            for number in ('1.0', '2.0'):
+                DatasetVersion.objects.create(
+                    dataset=dataset,
+                    version_number=number,
+                    created_by=self.user,
+                    file_url='http://example.com/data.csv'
+                )
+
+    def test_featured_datasets_query_count(self):
+        """Test that featured cards read formats and version counts from annotations"""
+        self.create_featured_datasets(5)
         
-        # Test anonymous user
-        download.user = None
-        download.save()
-        expected_str = f'{self.dataset.title} - Anonymous'
-        self.assertEqual(str(download), expected_str)
+        # Session, user, paginator count, categories, featured datasets and the
+        # list page with its contributor, version and attachment prefetches
+        with self.assertNumQueries(9):
+            response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['featured_datasets']), 5)
+        self.assertContains(response, '2 versions', count=5)
+
+    def test_search_matches_tags(self):
+        """Test that the search box finds datasets by a single tag"""
+        tagged = Dataset.objects.create(
+            title='Tagged Dataset',
+            description='Test description',
+            owner=self.user,
+            tags=['climate', 'vienna']
+        )
+        Dataset.objects.create(title='Other Dataset', description='Test description', owner=self.user)
+        
+        response = self.client.get(self.url, {'search': 'climate'})
+        self.assertEqual(list(response.context['datasets']), [tagged])
+        
+        response = self.client.get(self.url, {'search': ','})
+        self.assertEqual(list(response.context['datasets']), [])
 
 
-class DatasetDownloadViewTests(TestCase):
-    """Test cases for the dataset download view handling attachments."""
+class DatasetAdminTests(TestCase):
+    """Test cases for the dataset admin"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(
+            username='superuser',
+            email='super@example.com',
+            password='testpass123'
+        )
+        cls.tagged = Dataset.objects.create(
+            title='Tagged Dataset',
+            description='Test description',
+            owner=cls.superuser,
+            tags=['climate', 'vienna']
+        )
+        Dataset.objects.create(title='Other Dataset', description='Test description', owner=cls.superuser)
 
     def setUp(self):
-        self.temp_media = TemporaryDirectory()
-        self.addCleanup(self.temp_media.cleanup)
-        self.override_media = override_settings(MEDIA_ROOT=self.temp_media.name)
-        self.override_media.enable()
-        self.addCleanup(self.override_media.disable)
+        self.client.force_login(self.superuser)
+        self.url = reverse('admin:datasets_dataset_changelist')
 
-        self.owner = User.objects.create_user(
+    def test_search_matches_tags(self):
+        """Test that the admin search finds datasets by a single tag"""
+        response = self.client.get(self.url, {'q': 'climate'})
+        self.assertEqual(list(response.context['cl'].queryset), [self.tagged])
+        
+        response = self.client.get(self.url, {'q': ','})
+        self.assertEqual(list(response.context['cl'].queryset), [])
+
+    def test_search_keeps_list_filters(self):
+        """Test that tag matches still respect the changelist filters"""
+        response = self.client.get(self.url, {'q': 'climate', 'status__exact': 'published'})
+        self.assertEqual(list(response.context['cl'].queryset), [])
+
+
+class DatasetVersionCreateViewTests(TemporaryMediaMixin, TestCase):
+    """Test cases for creating dataset versions with uploaded attachments."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(
+            username='version_owner',
+            email='version_owner@example.com',
+            password='testpass123'
+        )
+        cls.dataset = Dataset.objects.create(
+            title='Versioned Dataset',
+            description='Receives a new version',
+            owner=cls.owner
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.owner)
+
+    def test_upload_creates_attachments_with_single_audit_entry(self):
+        """Uploading several files stores each attachment and one batch audit entry."""
+        from auditlog.models import LogEntry
+        url = reverse('datasets:dataset_version_create', args=[self.dataset.pk])
+        response = self.client.post(url, {
+            'version_number': '1.0',
+            'description': 'Initial release',
+            'input_method': 'upload',
+            'files': [
+                SimpleUploadedFile('data1.csv', b'col1,col2\n1,2\n'),
+                SimpleUploadedFile('data2.csv', b'col1,col2\n3,4\n'),
+            ],
+        })
+        self.assertRedirects(response, reverse('datasets:dataset_detail', args=[self.dataset.pk]))
+
+        version = self.dataset.versions.get()
+        self.assertEqual(version.files.count(), 2)
+        self.assertEqual(version.formats, ['CSV'])
+        for attachment in version.files.all():
+            self.assertTrue(attachment.file.storage.exists(attachment.file.name))
+            self.assertEqual(attachment.file_size, 14)
+        self.assertFalse(LogEntry.objects.get_for_model(DatasetVersionFile).exists())
+
+        batch_entry = LogEntry.objects.get_for_object(version).filter(action=LogEntry.Action.UPDATE).get()
+        self.assertEqual(batch_entry.changes_dict['files'], ['', 'data1.csv, data2.csv'])
+        self.assertEqual(batch_entry.actor, self.owner)
+
+
+class DatasetDownloadViewTests(TemporaryMediaMixin, TestCase):
+    """Test cases for the dataset download view handling attachments."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(
             username='dataset_owner',
             email='owner@example.com',
             password='testpass123'
         )
-        self.downloader = User.objects.create_user(
+        # A recorded first login keeps the login-tracking write out of the query counts
+        cls.downloader = User.objects.create_user(
             username='downloader',
             email='downloader@example.com',
-            password='testpass123'
+            password='testpass123',
+            first_login_date=timezone.now()
         )
-        self.dataset = Dataset.objects.create(
+        cls.dataset = Dataset.objects.create(
             title='Downloadable Dataset',
             description='Contains multiple attachments',
-            owner=self.owner
+            owner=cls.owner
         )
-        self.version = DatasetVersion.objects.create(
-            dataset=self.dataset,
+        cls.version = DatasetVersion.objects.create(
+            dataset=cls.dataset,
             version_number='1.0',
             description='Initial release',
-            created_by=self.owner,
+            created_by=cls.owner,
             is_current=True
         )
 
+        # Attachment files are written once to the class media directory
         file_one = SimpleUploadedFile('first.csv', b'col1,col2\n1,2\n')
         file_two = SimpleUploadedFile('second.csv', b'col1,col2\n3,4\n')
 
-        self.attachment_one = DatasetVersionFile.objects.create(
-            version=self.version,
-            file=file_one,
-            file_size=file_one.size,
-            original_name='first.csv'
-        )
-        self.attachment_two = DatasetVersionFile.objects.create(
-            version=self.version,
-            file=file_two,
-            file_size=file_two.size,
-            original_name='second.csv'
+        cls.attachment_one, cls.attachment_two = DatasetVersionFile.bulk_attach(
+            cls.version, [file_one, file_two]
         )
 
-        self.version.file_size = self.attachment_one.file_size + self.attachment_two.file_size
-        self.version.save(update_fields=['file_size'])
+        cls.version.file_size = cls.attachment_one.file_size + cls.attachment_two.file_size
+        cls.version.save(update_fields=['file_size'])
 
-        self.client = Client()
+    def setUp(self):
         self.client.force_login(self.downloader)
 
     def test_download_defaults_to_first_attachment(self):
         """Downloading without specifying a file returns the first attachment."""
         url = reverse('datasets:dataset_download', args=[self.dataset.pk])
-        response = self.client.get(url)
+        # Session, user, dataset, version, attachment, download row, counter
+        with self.assertNumQueries(7):
+            response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
         self.assertIn(self.attachment_one.display_name, response.get('Content-Disposition', ''))
 
@@ -1271,7 +2088,8 @@ class DatasetDownloadViewTests(TestCase):
     def test_download_specific_attachment(self):
         """Downloading with file query parameter returns the requested attachment."""
         url = reverse('datasets:dataset_download', args=[self.dataset.pk])
-        response = self.client.get(url, {'version': self.version.id, 'file': self.attachment_two.id})
+        with self.assertNumQueries(7):
+            response = self.client.get(url, {'version': self.version.id, 'file': self.attachment_two.id})
         self.assertEqual(response.status_code, 200)
         self.assertIn(self.attachment_two.display_name, response.get('Content-Disposition', ''))
 
@@ -1282,17 +2100,18 @@ class DatasetDownloadViewTests(TestCase):
 class DatasetDeleteViewTests(TestCase):
     """Test cases for DatasetDeleteView - superuser only deletion"""
     
-    def setUp(self):
-        """Set up test data"""
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data once for the whole class"""
         # Create regular user
-        self.regular_user = User.objects.create_user(
+        cls.regular_user = User.objects.create_user(
             username='regularuser',
             email='regular@example.com',
             password='testpass123'
         )
         
         # Create staff user (not superuser)
-        self.staff_user = User.objects.create_user(
+        cls.staff_user = User.objects.create_user(
             username='staffuser',
             email='staff@example.com',
             password='testpass123',
@@ -1300,71 +2119,73 @@ class DatasetDeleteViewTests(TestCase):
         )
         
         # Create superuser
-        self.superuser = User.objects.create_superuser(
+        cls.superuser = User.objects.create_superuser(
             username='superuser',
             email='super@example.com',
             password='testpass123'
         )
         
         # Create a publisher and category for datasets
-        self.publisher = Publisher.objects.create(
+        cls.publisher = Publisher.objects.create(
             name='Test Publisher',
             description='Test publisher description'
         )
         
-        self.category = DatasetCategory.objects.create(
+        cls.category = DatasetCategory.objects.create(
             name='Test Category',
             description='Test category description'
         )
         
         # Create datasets owned by regular user
-        self.dataset1 = Dataset.objects.create(
+        cls.dataset1 = Dataset.objects.create(
             title='Test Dataset 1',
             description='Test description 1',
-            owner=self.regular_user,
-            publisher=self.publisher,
-            category=self.category,
+            owner=cls.regular_user,
+            publisher=cls.publisher,
+            category=cls.category,
             status='published'
         )
         
-        self.dataset2 = Dataset.objects.create(
+        cls.dataset2 = Dataset.objects.create(
             title='Test Dataset 2',
             description='Test description 2',
-            owner=self.regular_user,
-            publisher=self.publisher,
+            owner=cls.regular_user,
+            publisher=cls.publisher,
             status='draft'
         )
         
         # Create dataset version for dataset1
-        self.version = DatasetVersion.objects.create(
-            dataset=self.dataset1,
+        cls.version = DatasetVersion.objects.create(
+            dataset=cls.dataset1,
             version_number='1.0',
             description='Initial version',
-            created_by=self.regular_user
+            created_by=cls.regular_user
         )
         
         # Create download record for dataset1
-        self.download = DatasetDownload.objects.create(
-            dataset=self.dataset1,
-            user=self.regular_user,
+        cls.download = DatasetDownload.objects.create(
+            dataset=cls.dataset1,
+            user=cls.regular_user,
             ip_address='192.168.1.1',
             user_agent='Mozilla/5.0'
         )
         
         # Create comment for dataset1
-        self.comment = Comment.objects.create(
-            dataset=self.dataset1,
-            author=self.regular_user,
+        cls.comment = Comment.objects.create(
+            dataset=cls.dataset1,
+            author=cls.regular_user,
             content='Test comment'
         )
         
-        self.client = Client()
+        # Resolve the URLs shared by the tests once
+        cls.delete_url = reverse('datasets:dataset_delete', kwargs={'pk': cls.dataset1.pk})
+        cls.delete_url_2 = reverse('datasets:dataset_delete', kwargs={'pk': cls.dataset2.pk})
+        cls.detail_url = reverse('datasets:dataset_detail', kwargs={'pk': cls.dataset1.pk})
     
     def test_superuser_can_access_delete_page(self):
         """Test that superuser can access the delete confirmation page"""
-        self.client.login(username='superuser', password='testpass123')
-        url = reverse('datasets:dataset_delete', kwargs={'pk': self.dataset1.pk})
-        response = self.client.get(url)
+        self.client.force_login(self.superuser)
+        response = self.client.get(self.delete_url)
         
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'datasets/dataset_confirm_delete.html')
@@ -1373,14 +2194,13 @@ class DatasetDeleteViewTests(TestCase):
     
     def test_superuser_can_delete_dataset(self):
         """Test that superuser can successfully delete a dataset"""
-        self.client.login(username='superuser', password='testpass123')
-        url = reverse('datasets:dataset_delete', kwargs={'pk': self.dataset1.pk})
+        self.client.force_login(self.superuser)
         
         # Verify dataset exists before deletion
         self.assertTrue(Dataset.objects.filter(pk=self.dataset1.pk).exists())
         
         # Delete the dataset
-        response = self.client.post(url, follow=True)
+        response = self.client.post(self.delete_url, follow=True)
         
         # Check that dataset was deleted
         self.assertFalse(Dataset.objects.filter(pk=self.dataset1.pk).exists())
@@ -1395,8 +2215,7 @@ class DatasetDeleteViewTests(TestCase):
     
     def test_superuser_can_delete_dataset_with_related_objects(self):
         """Test that superuser can delete a dataset and related objects are cascaded"""
-        self.client.login(username='superuser', password='testpass123')
-        url = reverse('datasets:dataset_delete', kwargs={'pk': self.dataset1.pk})
+        self.client.force_login(self.superuser)
         
         dataset_id = self.dataset1.pk
         version_id = self.version.pk
@@ -1409,7 +2228,7 @@ class DatasetDeleteViewTests(TestCase):
         self.assertTrue(Comment.objects.filter(pk=comment_id).exists())
         
         # Delete the dataset
-        response = self.client.post(url, follow=True)
+        response = self.client.post(self.delete_url, follow=True)
         
         # Check that dataset was deleted
         self.assertFalse(Dataset.objects.filter(pk=dataset_id).exists())
@@ -1421,26 +2240,22 @@ class DatasetDeleteViewTests(TestCase):
     
     def test_regular_user_cannot_access_delete_page(self):
         """Test that regular user cannot access the delete confirmation page"""
-        self.client.login(username='regularuser', password='testpass123')
-        url = reverse('datasets:dataset_delete', kwargs={'pk': self.dataset1.pk})
-        response = self.client.get(url, follow=True)
+        self.client.force_login(self.regular_user)
+        response = self.client.get(self.delete_url, follow=True)
         
         # Should redirect with error message
-        redirect_url = reverse('datasets:dataset_detail', kwargs={'pk': self.dataset1.pk})
-        self.assertIn((redirect_url, 302), response.redirect_chain)
+        self.assertIn((self.detail_url, 302), response.redirect_chain)
         
         flash_messages = list(get_messages(response.wsgi_request))
         self.assertTrue(any('Access denied. Only superusers can delete datasets.' in str(message) for message in flash_messages))
     
     def test_regular_user_cannot_delete_own_dataset(self):
         """Test that even dataset owners cannot delete their own datasets (only superusers can)"""
-        self.client.login(username='regularuser', password='testpass123')
-        url = reverse('datasets:dataset_delete', kwargs={'pk': self.dataset1.pk})
+        self.client.force_login(self.regular_user)
         
         # Try to delete (even though user owns the dataset)
-        response = self.client.post(url, follow=True)
-        redirect_url = reverse('datasets:dataset_detail', kwargs={'pk': self.dataset1.pk})
-        self.assertIn((redirect_url, 302), response.redirect_chain)
+        response = self.client.post(self.delete_url, follow=True)
+        self.assertIn((self.detail_url, 302), response.redirect_chain)
         
         # Dataset should still exist
         self.assertTrue(Dataset.objects.filter(pk=self.dataset1.pk).exists())
@@ -1451,12 +2266,10 @@ class DatasetDeleteViewTests(TestCase):
     
     def test_staff_user_cannot_delete_dataset(self):
         """Test that staff users (non-superuser) cannot delete datasets"""
-        self.client.login(username='staffuser', password='testpass123')
-        url = reverse('datasets:dataset_delete', kwargs={'pk': self.dataset1.pk})
-        response = self.client.get(url, follow=True)
+        self.client.force_login(self.staff_user)
+        response = self.client.get(self.delete_url, follow=True)
         
-        redirect_url = reverse('datasets:dataset_detail', kwargs={'pk': self.dataset1.pk})
-        self.assertIn((redirect_url, 302), response.redirect_chain)
+        self.assertIn((self.detail_url, 302), response.redirect_chain)
         self.assertTrue(Dataset.objects.filter(pk=self.dataset1.pk).exists())
         
         flash_messages = list(get_messages(response.wsgi_request))
@@ -1464,8 +2277,7 @@ class DatasetDeleteViewTests(TestCase):
     
     def test_unauthenticated_user_cannot_delete_dataset(self):
         """Test that unauthenticated users cannot delete datasets"""
-        url = reverse('datasets:dataset_delete', kwargs={'pk': self.dataset1.pk})
-        response = self.client.get(url)
+        response = self.client.get(self.delete_url)
         
         # Should redirect to login page
         self.assertEqual(response.status_code, 302)
@@ -1476,16 +2288,14 @@ class DatasetDeleteViewTests(TestCase):
     
     def test_superuser_can_delete_multiple_datasets(self):
         """Test that superuser can delete multiple datasets"""
-        self.client.login(username='superuser', password='testpass123')
+        self.client.force_login(self.superuser)
         
         # Delete first dataset
-        url1 = reverse('datasets:dataset_delete', kwargs={'pk': self.dataset1.pk})
-        response1 = self.client.post(url1, follow=True)
+        response1 = self.client.post(self.delete_url, follow=True)
         self.assertFalse(Dataset.objects.filter(pk=self.dataset1.pk).exists())
         
         # Delete second dataset
-        url2 = reverse('datasets:dataset_delete', kwargs={'pk': self.dataset2.pk})
-        response2 = self.client.post(url2, follow=True)
+        response2 = self.client.post(self.delete_url_2, follow=True)
         self.assertFalse(Dataset.objects.filter(pk=self.dataset2.pk).exists())
         
         # Both should be deleted
@@ -1493,7 +2303,7 @@ class DatasetDeleteViewTests(TestCase):
     
     def test_delete_nonexistent_dataset_returns_404(self):
         """Test that deleting a non-existent dataset returns 404"""
-        self.client.login(username='superuser', password='testpass123')
+        self.client.force_login(self.superuser)
         fake_uuid = uuid.uuid4()
         url = reverse('datasets:dataset_delete', kwargs={'pk': fake_uuid})
         with self.assertLogs('django.request', level='WARNING') as log_capture:
@@ -1503,7 +2313,7 @@ class DatasetDeleteViewTests(TestCase):
         self.assertTrue(any('Not Found' in entry for entry in log_capture.output))
 
 
-class DatasetAnalysisModelTests(TestCase):
+class DatasetAnalysisModelTests(TemporaryMediaMixin, TestCase):
     """Test cases for DatasetAnalysis model"""
     
     def setUp(self):
@@ -1751,7 +2561,7 @@ class DatasetAnalysisModelTests(TestCase):
         self.assertEqual(analyses[1], analysis1)
 
 
-class DatasetAnalysisFormTests(TestCase):
+class DatasetAnalysisFormTests(TemporaryMediaMixin, TestCase):
     """Test cases for DatasetAnalysisForm"""
     
     def setUp(self):
@@ -12,6 +12,7 @@ from django.core.paginator import Paginator
 from django.utils import timezone
 from django.db import transaction
 from pathlib import Path
+from auditlog.models import LogEntry
 
 from .models import (
     Dataset,
@@ -92,7 +93,7 @@ class DatasetListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         # All authenticated users can see all datasets regardless of status
-        queryset = Dataset.objects.all().select_related('owner', 'category').prefetch_related('contributors', 'versions', 'versions__files')
+        queryset = Dataset.objects.with_related().for_list().select_related('publisher')
         
         # Filter by category
         category = self.request.GET.get('category')
@@ -102,20 +103,15 @@ class DatasetListView(LoginRequiredMixin, ListView):
         # Filter by search query
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(abstract__icontains=search) |
-                Q(keywords__icontains=search) |
-                Q(tags__icontains=search)
-            )
+            queryset = queryset.search(search)
         
         # Filter by tags
         tags = self.request.GET.get('tags')
         if tags:
-            tag_list = [tag.strip() for tag in tags.split(',')]
-            for tag in tag_list:
-                queryset = queryset.filter(tags__icontains=tag)
+            tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
+            if tag_list:
+                # Array containment is served by the GIN index on tags
+                queryset = queryset.filter(tags__contains=tag_list)
         
         # Order by featured first, then by creation date
         return queryset.order_by('-is_featured', '-created_at')
@@ -128,13 +124,13 @@ class DatasetListView(LoginRequiredMixin, ListView):
         if self.request.user and self.request.user.is_authenticated and self.request.user.is_superuser:
             featured_queryset = Dataset.objects.filter(
                 is_featured=True
-            ).select_related('owner', 'category').prefetch_related('versions', 'versions__files')
+            ).select_related('owner', 'category', 'publisher').for_list().with_formats()
         else:
             # Featured datasets including user's private datasets
             featured_queryset = Dataset.objects.filter(
                 is_featured=True,
                 access_level__in=['public', 'restricted']
-            ).select_related('owner', 'category').prefetch_related('versions', 'versions__files')
+            ).select_related('owner', 'category', 'publisher').for_list().with_formats()
             
             # Add user's private featured datasets
             if self.request.user and self.request.user.is_authenticated:
@@ -142,7 +138,7 @@ class DatasetListView(LoginRequiredMixin, ListView):
                     owner=self.request.user,
                     is_featured=True,
                     access_level='private'
-                ).select_related('owner', 'category').prefetch_related('versions', 'versions__files')
+                ).select_related('owner', 'category', 'publisher').for_list().with_formats()
                 
                 featured_queryset = featured_queryset.union(user_private_featured)
         
@@ -169,8 +165,8 @@ class DatasetDetailView(LoginRequiredMixin, DetailView):
         obj = super().get_object(queryset)
         
         # Increment view count for authenticated users
+        Dataset.increment_views(obj.pk)
         obj.view_count += 1
-        obj.save(update_fields=['view_count'])
         
         return obj
 
@@ -351,9 +347,8 @@ def dataset_download(request, pk):
         user_agent=request.META.get('HTTP_USER_AGENT', '')
     )
     
-    # Increment download count
-    dataset.download_count += 1
-    dataset.save(update_fields=['download_count'])
+    # Increment download count atomically in the database
+    Dataset.increment_downloads(dataset.pk)
     
     # Serve file or redirect to URL
     if storage_file:
@@ -451,18 +446,19 @@ class DatasetVersionCreateView(LoginRequiredMixin, CreateView):
 
                 # Persist uploaded files as separate attachments
                 if input_method == 'upload':
-                    for idx, upload in enumerate(uploaded_files):
-                        try:
-                            DatasetVersionFile.objects.create(
-                                version=self.object,
-                                file=upload,
-                                file_size=upload.size,
-                                original_name=upload.name,
-                            )
-                            logger.debug(f'File {idx+1}/{len(uploaded_files)} uploaded: {upload.name} ({upload.size} bytes)')
-                        except Exception as e:
-                            logger.error(f'Error saving file {upload.name}: {str(e)}', exc_info=True)
-                            raise
+                    try:
+                        DatasetVersionFile.bulk_attach(self.object, uploaded_files)
+                        logger.debug(f'{len(uploaded_files)} files uploaded for version {self.object.pk}')
+                    except Exception as e:
+                        logger.error(f'Error saving uploaded files: {str(e)}', exc_info=True)
+                        raise
+                    # Record one audit entry for the whole batch instead of one per attachment
+                    LogEntry.objects.log_create(
+                        self.object,
+                        action=LogEntry.Action.UPDATE,
+                        changes={'files': ['', ', '.join(upload.name for upload in uploaded_files)]},
+                        actor=self.request.user,
+                    )
 
             # Send notification about new version
             try:
@@ -656,7 +652,8 @@ class DatasetCategoryDeleteView(LoginRequiredMixin, AdministratorOnlyMixin, Dele
 @login_required
 def add_comment(request, dataset_id):
     """Add a comment to a dataset"""
-    dataset = get_object_or_404(Dataset, id=dataset_id)
+    # The owner is needed for the notification check and email
+    dataset = get_object_or_404(Dataset.objects.select_related('owner'), id=dataset_id)
     
     if request.method == 'POST':
         form = CommentForm(request.POST, user=request.user, dataset=dataset)
@@ -735,16 +732,14 @@ def send_comment_notification_email(comment):
     dataset = comment.dataset
     owner = dataset.owner
     
-    logger.info(f"Comment notification email requested for dataset '{dataset.title}' (ID: {dataset.id})")
-    logger.info(f"Dataset owner: {owner.username} ({owner.email})")
-    logger.info(f"Comment author: {comment.author.username}")
-    
-    # Check if owner wants to receive comment notifications
+    # Check if owner wants to receive comment notifications before any other work
     if not owner.notify_comments:
         logger.info(f"Comment notifications disabled for user {owner.username}, skipping email")
         return
     
-    logger.info(f"Comment notifications enabled for user {owner.username}, proceeding with email")
+    logger.info(f"Comment notification email requested for dataset '{dataset.title}' (ID: {dataset.id})")
+    logger.info(f"Dataset owner: {owner.username} ({owner.email})")
+    logger.info(f"Comment author: {comment.author.username}")
     
     # Prepare email context
     context = {
@@ -779,16 +774,55 @@ def send_comment_notification_email(comment):
         logger.info(f"Comment notification email sent successfully to {owner.email}")
         return result
     except Exception as e:
-        logger.error(f"Failed to send comment notification email to {owner.email}: {str(e)}")
+        logger.exception(f"Failed to send comment notification email to {owner.email}: {str(e)}")
         logger.error(f"Email backend: {settings.EMAIL_BACKEND}")
         logger.error(f"SMTP settings: host={getattr(settings, 'EMAIL_HOST', 'N/A')}, port={getattr(settings, 'EMAIL_PORT', 'N/A')}")
         raise
 
 
+def _send_notification_messages(subject, plain_message, html_message, recipients, description):
+    """Send one notification per recipient over a single mail connection"""
+    import logging
+    from django.core.mail import EmailMultiAlternatives, get_connection
+    from django.conf import settings
+    
+    logger = logging.getLogger('datasets.email')
+    
+    success_count = 0
+    failure_count = 0
+    
+    try:
+        # Opening the connection once avoids a new SMTP handshake per recipient
+        with get_connection(fail_silently=False) as connection:
+            for recipient in recipients:
+                message = EmailMultiAlternatives(
+                    subject=subject,
+                    body=plain_message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[recipient],
+                    connection=connection,
+                )
+                message.attach_alternative(html_message, 'text/html')
+                try:
+                    logger.info(f"Attempting to send {description} email to {recipient}")
+                    message.send()
+                    logger.info(f"{description.capitalize()} email sent successfully to {recipient}")
+                    success_count += 1
+                except Exception as e:
+                    logger.exception(f"Failed to send {description} email to {recipient}: {str(e)}")
+                    failure_count += 1
+    except Exception as e:
+        # The connection could not be opened or closed cleanly
+        logger.exception(f"Failed to open mail connection for {description} emails: {str(e)}")
+        failure_count = len(recipients) - success_count
+    
+    logger.info(f"{description.capitalize()} email summary: {success_count} sent, {failure_count} failed")
+    return success_count
+
+
 def send_dataset_update_notification_email(dataset):
     """Send email notification to users following this dataset about updates"""
     import logging
-    from django.core.mail import send_mail
     from django.template.loader import render_to_string
     from django.conf import settings
     from user.models import CustomUser
@@ -800,14 +834,14 @@ def send_dataset_update_notification_email(dataset):
     # Get users who want to receive dataset update notifications
     # For now, we'll notify all users who have this preference enabled
     # In a more advanced system, you might have a "following" relationship
-    users_to_notify = CustomUser.objects.filter(
+    recipients = list(CustomUser.objects.filter(
         notify_dataset_updates=True,
         is_active=True
-    ).exclude(email='')
+    ).exclude(email='').values_list('email', flat=True))
     
-    logger.info(f"Found {users_to_notify.count()} users with dataset update notifications enabled")
+    logger.info(f"Found {len(recipients)} users with dataset update notifications enabled")
     
-    if not users_to_notify.exists():
+    if not recipients:
         logger.info("No users to notify for dataset updates, skipping email")
         return
     
@@ -829,34 +863,12 @@ def send_dataset_update_notification_email(dataset):
     logger.info(f"HTML message length: {len(html_message)} chars")
     
     # Send emails to all users
-    success_count = 0
-    failure_count = 0
-    
-    for user in users_to_notify:
-        try:
-            logger.info(f"Attempting to send dataset update notification email to {user.email}")
-            context['user'] = user
-            result = send_mail(
-                subject=subject,
-                message=plain_message,
-                html_message=html_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                fail_silently=False,
-            )
-            logger.info(f"Dataset update notification email sent successfully to {user.email}")
-            success_count += 1
-        except Exception as e:
-            logger.error(f"Failed to send dataset update notification email to {user.email}: {str(e)}")
-            failure_count += 1
-    
-    logger.info(f"Dataset update notification email summary: {success_count} sent, {failure_count} failed")
+    _send_notification_messages(subject, plain_message, html_message, recipients, 'dataset update notification')
 
 
 def send_new_version_notification_email(dataset, version):
     """Send email notification to users following this dataset about new versions"""
     import logging
-    from django.core.mail import send_mail
     from django.template.loader import render_to_string
     from django.conf import settings
     from user.models import CustomUser
@@ -867,14 +879,14 @@ def send_new_version_notification_email(dataset, version):
     logger.info(f"Version: {version.version_number}")
     
     # Get users who want to receive new version notifications
-    users_to_notify = CustomUser.objects.filter(
+    recipients = list(CustomUser.objects.filter(
         notify_new_versions=True,
         is_active=True
-    ).exclude(email='')
+    ).exclude(email='').values_list('email', flat=True))
     
-    logger.info(f"Found {users_to_notify.count()} users with new version notifications enabled")
+    logger.info(f"Found {len(recipients)} users with new version notifications enabled")
     
-    if not users_to_notify.exists():
+    if not recipients:
         logger.info("No users to notify for new versions, skipping email")
         return
     
@@ -897,28 +909,7 @@ def send_new_version_notification_email(dataset, version):
     logger.info(f"HTML message length: {len(html_message)} chars")
     
     # Send emails to all users
-    success_count = 0
-    failure_count = 0
-    
-    for user in users_to_notify:
-        try:
-            logger.info(f"Attempting to send new version notification email to {user.email}")
-            context['user'] = user
-            result = send_mail(
-                subject=subject,
-                message=plain_message,
-                html_message=html_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                fail_silently=False,
-            )
-            logger.info(f"New version notification email sent successfully to {user.email}")
-            success_count += 1
-        except Exception as e:
-            logger.error(f"Failed to send new version notification email to {user.email}: {str(e)}")
-            failure_count += 1
-    
-    logger.info(f"New version notification email summary: {success_count} sent, {failure_count} failed")
+    _send_notification_messages(subject, plain_message, html_message, recipients, 'new version notification')
 
 
 # Publisher Views
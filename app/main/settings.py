@@ -138,6 +138,10 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Tests create many users but never depend on hash strength, so use a fast hasher
+if 'test' in sys.argv or 'pytest' in sys.modules:
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -241,7 +245,12 @@ LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
 # File Upload Settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024 * 1024  # 1GB
+# Stream every upload to a temporary file so large datasets never sit in memory;
+# FileSystemStorage then moves the temporary file into MEDIA_ROOT
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+FILE_UPLOAD_MAX_MEMORY_SIZE = 0
 DATA_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024 * 1024  # 1GB
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000
 
@@ -4,11 +4,12 @@ from django.contrib import messages
 from django.views.generic import (
     ListView, DetailView, CreateView, UpdateView, DeleteView
 )
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Prefetch
 from django.urls import reverse_lazy
 from django.http import Http404
 from django.contrib.auth import get_user_model
 
+from datasets.models import Dataset
 from .models import Project
 from .forms import ProjectForm, ProjectFilterForm, ProjectTransferOwnershipForm
 
@@ -95,8 +96,12 @@ class ProjectDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'project'
     
     def get_queryset(self):
+        # Resolve dataset access in SQL so the template does not check it per row
+        datasets = Dataset.objects.visible_to(self.request.user).select_related(
+            'owner', 'category'
+        ).prefetch_related('versions')
         return Project.objects.select_related('owner').prefetch_related(
-            'collaborators', 'datasets__owner', 'datasets__category', 'datasets__versions'
+            'collaborators', Prefetch('datasets', queryset=datasets)
         )
     
     def get_object(self, queryset=None):